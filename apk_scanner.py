@@ -7,12 +7,27 @@ Works on both Windows and Linux/Unix systems
 import os
 import sys
 import re
+import struct
 import subprocess
 import argparse
 import shutil
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Optional
 
+from apkdiff import DEFAULT_MAX_STATES, diff_apks
+from bundles import APK_SUFFIXES, BUNDLE_SUFFIXES, App, find_apps, has_code, merge_split_tree, split_dir_name
+from entropy import DEFAULT_THRESHOLD as DEFAULT_ENTROPY_THRESHOLD
+from scancache import read_stats
+from scheduler import ResourceScheduler, configure_logging, estimate_cost
+from triage import DEFAULT_ESCALATE_THRESHOLD, quick_scan
+
 
 # ANSI color codes
 class Colors:
@@ -132,8 +147,19 @@ def check_command(command: str) -> bool:
     return shutil.which(command) is not None
 
 
-def decompile_apk(apk_path: str, output_dir: str) -> bool:
-    """Decompile APK using apktool"""
+def decompile_apk(apk_path: str, output_dir: str, no_src: bool = False, no_res: bool = False,
+                  heap_mb: Optional[int] = None, quiet: bool = False) -> bool:
+    """Decompile APK using apktool, optionally leaving dex files or resources undecoded.
+
+    heap_mb caps the JVM heap for this run; quiet captures apktool's console output.
+    """
+    flags = ['-f']
+    if no_src:
+        flags.append('-s')
+    if no_res:
+        flags.append('-r')
+    java_options = [f'-Xmx{heap_mb}m'] if heap_mb else []
+    
     try:
         # Check for Java (apktool requires Java)
         if not check_command('java'):
@@ -144,18 +170,25 @@ def decompile_apk(apk_path: str, output_dir: str) -> bool:
         jar_path = Path(__file__).parent / 'apktool.jar'
         if jar_path.exists():
             result = subprocess.run(
-                ['java', '-jar', str(jar_path), 'd', '-f', apk_path, '-o', output_dir],
-                capture_output=False,  # Let output go to console
+                ['java', *java_options, '-jar', str(jar_path), 'd', *flags, apk_path, '-o', output_dir],
+                capture_output=quiet,  # Let output go to console unless running in parallel
                 text=True
             )
+            if result.returncode != 0 and result.stderr:
+                print(f"{Colors.RED}[-] apktool failed on {Path(apk_path).name}:\n{result.stderr.rstrip()}{Colors.RESET}")
             return result.returncode == 0
         # Try standard apktool command if jar is not available
         elif check_command('apktool'):
+            # The wrapper script builds its own java command line; the JVM still honours _JAVA_OPTIONS
+            env = dict(os.environ, _JAVA_OPTIONS=' '.join(java_options)) if java_options else None
             result = subprocess.run(
-                ['apktool', 'd', '-f', apk_path, '-o', output_dir],
+                ['apktool', 'd', *flags, apk_path, '-o', output_dir],
                 capture_output=True,
-                text=True
+                text=True,
+                env=env
             )
+            if result.returncode != 0 and result.stderr:
+                print(f"{Colors.RED}[-] apktool failed on {Path(apk_path).name}:\n{result.stderr.rstrip()}{Colors.RESET}")
             return result.returncode == 0
         else:
             print(f"{Colors.RED}[-] Error: apktool not found. Please install apktool.{Colors.RESET}")
@@ -165,7 +198,26 @@ def decompile_apk(apk_path: str, output_dir: str) -> bool:
         return False
 
 
-def run_analysis_scripts(app_dir: str, report_file: Optional[str] = None) -> list:
+# Scripts that scan files one by one: they take --cache-dir, --jobs and --exclude
+FILE_LEVEL_SCRIPTS = {'findkeys.py', 'findendpoints.py'}
+# Copied unchanged by apktool; assetscan.py reads them from the APK zip instead
+STREAMED_DIRS = ('assets', 'res/raw')
+# Native libraries; elfstrings.py checks their .rodata/.data strings instead
+NATIVE_DIRS = ('lib',)
+# Decoded value resources; arsc.py checks each unique string in resources.arsc instead
+VALUES_DIRS = ('res/values*',)
+
+
+def entropy_arguments(entropy_threshold: Optional[float]) -> list:
+    """Command-line arguments passing the entropy setting to a script (None disables the detector)"""
+    if entropy_threshold is None:
+        return ['--no-entropy']
+    return ['--entropy-threshold', str(entropy_threshold)]
+
+
+def run_analysis_scripts(app_dir: str, report_file: Optional[str] = None, cache_dir: Optional[str] = None,
+                         jobs: int = 1, exclude: tuple = (),
+                         entropy_threshold: Optional[float] = DEFAULT_ENTROPY_THRESHOLD) -> list:
     """Run all analysis scripts on the decompiled app"""
     scripts = [
         'exported.py',
@@ -187,27 +239,191 @@ def run_analysis_scripts(app_dir: str, report_file: Optional[str] = None) -> lis
         
         try:
             python_cmd = sys.executable
+            command = [python_cmd, str(script_path), app_dir]
+            if cache_dir and script in FILE_LEVEL_SCRIPTS:
+                command += ['--cache-dir', cache_dir]
+            if jobs > 1 and script in FILE_LEVEL_SCRIPTS:
+                command += ['--jobs', str(jobs)]
+            if script in FILE_LEVEL_SCRIPTS:
+                for directory in exclude:
+                    command += ['--exclude', directory]
+            if script == 'findkeys.py':
+                command += entropy_arguments(entropy_threshold)
             
             if report_file:
                 with open(report_file, 'a', encoding='utf-8') as f:
                     subprocess.run(
-                        [python_cmd, str(script_path), app_dir],
+                        command,
                         stdout=f,
                         stderr=subprocess.STDOUT,
                         text=True
                     )
             else:
-                subprocess.run([python_cmd, str(script_path), app_dir], check=False)
+                subprocess.run(command, check=False)
         except Exception as e:
             print_output(f"{Colors.RED}[-] Error running {script}: {e}{Colors.RESET}\n", report_file)
 
 
-def process_single_apk(apk_path: str, report_file: Optional[str] = None):
-    """Process a single APK file"""
-    base_name = Path(apk_path).stem
-    apk_name = Path(apk_path).name
+def print_dedup_stats(cache_dir: str, report_file: Optional[str] = None):
+    """Report how many file scans the dedup cache saved"""
+    totals = read_stats(cache_dir)
+    if not totals:
+        return
     
-    print_output(f"{Colors.GREEN}[+] Processing single APK: {apk_name}...{Colors.RESET}\n", report_file)
+    for namespace, (hits, misses) in sorted(totals.items()):
+        scanned = hits + misses
+        ratio = hits / scanned if scanned else 0.0
+        print_output(
+            f"{Colors.BLUE}[*] Dedup ({namespace}): {scanned} files, {misses} unique, "
+            f"{hits} served from cache ({ratio:.1%} dedup ratio){Colors.RESET}\n",
+            report_file
+        )
+
+
+def start_zip_scan(script: str, apk_paths: list, arguments: list = ()):
+    """Start a script that reads the APKs directly in the background; its output is buffered in a temp file"""
+    output = tempfile.TemporaryFile(mode='w+', encoding='utf-8')
+    command = [sys.executable, str(Path(__file__).parent / script), *arguments, *apk_paths]
+    process = subprocess.Popen(command, stdout=output, stderr=subprocess.STDOUT, text=True)
+    return process, output
+
+
+def stop_zip_scan(zip_scan, cancel: bool = False):
+    """Wait for a background zip scan to exit, killing it first when cancel is set"""
+    process, _ = zip_scan
+    if cancel:
+        process.kill()
+    process.wait()
+
+
+def finish_zip_scan(zip_scan, report_file: Optional[str] = None, cancel: bool = False) -> bool:
+    """Wait for a background zip scan and write its output, or stop it when cancel is set.
+    
+    Returns True when the scan read everything it was meant to (exit status 0).
+    """
+    process, output = zip_scan
+    with output:
+        stop_zip_scan(zip_scan, cancel)
+        if cancel:
+            return False
+        output.seek(0)
+        text = output.read()
+    
+    if report_file:
+        with open(report_file, 'a', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text, end='', flush=True)
+    return process.returncode == 0
+
+
+@dataclass
+class ScanOptions:
+    """Run-wide settings shared by every APK scan"""
+    cache_dir: Optional[str] = None
+    tier: str = 'deep'
+    escalate_threshold: int = DEFAULT_ESCALATE_THRESHOLD
+    # Set for parallel folder runs; gates decompile and analysis on live resources
+    scheduler: Optional[ResourceScheduler] = None
+    # Worker processes for each file-level check within one APK
+    jobs: int = 1
+    # Scan assets/ and res/raw/ from the zip while apktool runs
+    stream_assets: bool = True
+    # Check strings from native libraries' .rodata/.data while apktool runs
+    native_strings: bool = True
+    # Check string resources from resources.arsc while apktool runs
+    resource_strings: bool = True
+    # Minimum confidence for high-entropy string findings; None disables the detector
+    entropy_threshold: Optional[float] = DEFAULT_ENTROPY_THRESHOLD
+
+
+def run_quick_tier(apk_path: str, report_file: Optional[str] = None,
+                   escalate_threshold: Optional[int] = None) -> Optional[dict]:
+    """Run the manifest-level checks and zip heuristics straight from the APK
+    
+    When escalate_threshold is given and the score reaches it, only the score is
+    printed: the deep tier's exported, permissions and providerRoot checks report
+    the same findings (plus those of merged splits) and would repeat them.
+    """
+    print_output(f"{Colors.BLUE}[*] Quick tier: reading manifest and zip entries...{Colors.RESET}\n", report_file)
+    
+    try:
+        result = quick_scan(apk_path)
+    except (zipfile.BadZipFile, KeyError, ValueError) as e:
+        print_output(f"{Colors.RED}[-] Error: Quick tier failed for {Path(apk_path).name}: {e}{Colors.RESET}\n", report_file)
+        return None
+    
+    if escalate_threshold is None or result['score'] < escalate_threshold:
+        for component, names in result['exported'].items():
+            for name in names:
+                print_output(f"{Colors.RED}EXPORTED {component.upper()} FOUND: {name}{Colors.RESET}\n", report_file)
+        for name, protection_level in result['permissions']:
+            print_output(f"{Colors.YELLOW}PERMISSION FOUND: {name} (protectionLevel: {protection_level}){Colors.RESET}\n", report_file)
+        for entry, tag in result['provider_paths']:
+            print_output(f"{Colors.RED}FOUND '{tag}' WITH PATH='/' IN {entry}{Colors.RESET}\n", report_file)
+    
+    reasons = ', '.join(f"{reason} (+{points})" for reason, points in result['reasons']) or 'no findings'
+    print_output(f"{Colors.MAGENTA}[*] Risk score: {result['score']} ({reasons}){Colors.RESET}\n", report_file)
+    return result
+
+
+def decompile_app(app: App, target_app_dir: Path, scheduler: Optional[ResourceScheduler] = None,
+                  zip_scripts: tuple = (), zip_arguments: list = ()) -> tuple:
+    """Decompile the base APK and its splits in parallel and merge the splits into the base's tree.
+    
+    Splits without dex files skip smali decoding. zip_scripts are started on the
+    app's APKs once the base APK holds its decompile slot and are waited for
+    before the slot is released (killed if the base fails), so the scheduler
+    accounts for them. Returns the APKs that failed to decompile and the zip scans.
+    """
+    zip_scans = []
+    
+    def decompile(apk_path: str, output_dir: Path) -> bool:
+        robust_remove_directory(output_dir)
+        try:
+            no_src = apk_path != app.base and not has_code(apk_path)
+        except zipfile.BadZipFile:
+            no_src = False
+        estimate = estimate_cost(apk_path) if scheduler else None
+        scripts = zip_scripts if apk_path == app.base else ()
+        with scheduler.decompile_slot(estimate, len(scripts)) if scheduler else nullcontext():
+            zip_scans.extend(start_zip_scan(script, app.apks, zip_arguments) for script in scripts)
+            decompiled = False
+            try:
+                # Concurrent apktool runs would interleave on the console
+                decompiled = decompile_apk(apk_path, str(output_dir), no_src=no_src,
+                                           heap_mb=estimate.heap_mb if estimate else None,
+                                           quiet=scheduler is not None or bool(app.splits))
+                return decompiled
+            finally:
+                if scripts:
+                    for zip_scan in zip_scans:
+                        stop_zip_scan(zip_scan, cancel=not decompiled)
+    
+    if not app.splits:
+        return ([] if decompile(app.base, target_app_dir) else [app.base]), zip_scans
+    
+    split_dirs = {split: target_app_dir.with_name(f'{target_app_dir.name}_{split_dir_name(split)}')
+                  for split in app.splits}
+    output_dirs = {app.base: target_app_dir, **split_dirs}
+    # Bundles can hold dozens of splits; without a scheduler, cap the concurrent apktool JVMs
+    workers = len(output_dirs) if scheduler else min(len(output_dirs), os.cpu_count() // 2 or 1)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = dict(zip(output_dirs, executor.map(decompile, output_dirs, output_dirs.values())))
+    
+    failed = [apk_path for apk_path, decompiled in results.items() if not decompiled]
+    for split, split_dir in split_dirs.items():
+        if results[split] and results[app.base]:
+            merge_split_tree(str(split_dir), str(target_app_dir), split_dir_name(split))
+        robust_remove_directory(split_dir)
+    return failed, zip_scans
+
+
+def run_deep_tier(app: App, report_file: Optional[str], options: ScanOptions,
+                  progress: Optional[tuple] = None) -> bool:
+    """Decompile the app (base APK and splits) and run every analysis script on it once"""
+    base_name = Path(app.name).stem
+    apk_name = app.name
     
     # Create temp directory in current working directory
     current_dir = Path.cwd()
@@ -216,107 +432,353 @@ def process_single_apk(apk_path: str, report_file: Optional[str] = None):
     # Remove existing directory if it exists
     robust_remove_directory(target_app_dir)
     
+    scheduler = options.scheduler
+    estimate = estimate_cost(app.base) if scheduler else None
+    
     # Decompile APK
-    print_output(f"{Colors.BLUE}[*] Decompiling APK...{Colors.RESET}\n", report_file)
+    if app.splits:
+        print_output(f"{Colors.BLUE}[*] Decompiling base APK and {len(app.splits)} splits in parallel...{Colors.RESET}\n", report_file)
+    else:
+        print_output(f"{Colors.BLUE}[*] Decompiling APK...{Colors.RESET}\n", report_file)
     
-    if not decompile_apk(apk_path, str(target_app_dir)):
+    # assets/, res/raw/, lib/ and string resources do not need apktool, so scan them from the zip in the meantime
+    zip_checks = {}
+    if options.stream_assets:
+        zip_checks['assetscan.py'] = STREAMED_DIRS
+    if options.native_strings:
+        zip_checks['elfstrings.py'] = NATIVE_DIRS
+    if options.resource_strings:
+        zip_checks['arsc.py'] = VALUES_DIRS
+    
+    failed, zip_scans = decompile_app(app, target_app_dir, scheduler, tuple(zip_checks),
+                                      entropy_arguments(options.entropy_threshold))
+    
+    if app.base in failed:
+        for zip_scan in zip_scans:
+            finish_zip_scan(zip_scan, cancel=True)
         print_output(f"{Colors.RED}[-] Error: Failed to decompile {apk_name}{Colors.RESET}\n", report_file)
         print_output(f"{Colors.CYAN}----------------------------------------{Colors.RESET}\n", report_file)
-        return
+        robust_remove_directory(target_app_dir)
+        return False
+    for split in failed:
+        print_output(f"{Colors.YELLOW}[!] Warning: Failed to decompile split {Path(split).name}, scanning without it{Colors.RESET}\n", report_file)
     
     # Check if decompilation succeeded
     manifest_path = target_app_dir / 'AndroidManifest.xml'
     
     if not manifest_path.exists():
+        for zip_scan in zip_scans:
+            finish_zip_scan(zip_scan, cancel=True)
         print_output(f"{Colors.RED}[-] Error: Failed to decompile {apk_name}{Colors.RESET}\n", report_file)
         print_output(f"{Colors.CYAN}----------------------------------------{Colors.RESET}\n", report_file)
-        return
+        return False
     
     # Run analysis scripts
     if report_file:
-        with open(report_file, 'a', encoding='utf-8') as f:
-            f.write(f"Analyzing {apk_name}...\n")
+        if progress:
+            display_progress(*progress)
+        else:
+            with open(report_file, 'a', encoding='utf-8') as f:
+                f.write(f"Analyzing {apk_name}...\n")
     
-    run_analysis_scripts(str(target_app_dir), report_file)
+    # Directories are only left out of the file-level scripts when their zip scan read everything
+    excluded_dirs = ()
+    for (script, directories), zip_scan in zip(zip_checks.items(), zip_scans):
+        if finish_zip_scan(zip_scan, report_file):
+            excluded_dirs += directories
+        else:
+            print_output(f"{Colors.YELLOW}[!] Warning: {script} could not read everything, scanning {', '.join(directories)} from the decompiled tree{Colors.RESET}\n", report_file)
     
-    if report_file:
+    with scheduler.analysis_slot(estimate, options.jobs) if scheduler else nullcontext():
+        run_analysis_scripts(str(target_app_dir), report_file, options.cache_dir, options.jobs, excluded_dirs,
+                             options.entropy_threshold)
+    
+    if report_file and not progress:
         with open(report_file, 'a', encoding='utf-8') as f:
             f.write("Analysis complete!\n")
     
     # Cleanup
     print_output(f"{Colors.BLUE}[*] Cleaning up decompiled files...{Colors.RESET}\n", report_file)
     robust_remove_directory(target_app_dir)
-    
+    return True
+
+
+def scan_apk(app: App, report_file: Optional[str], options: ScanOptions,
+             progress: Optional[tuple] = None) -> dict:
+    """Scan one app with the configured tier and return the seconds spent per tier"""
+    apk_name = app.name
+    timings = {}
+    run_deep = options.tier == 'deep'
+    
+    if options.tier in ('quick', 'auto'):
+        start = time.perf_counter()
+        escalate_threshold = options.escalate_threshold if options.tier == 'auto' else None
+        result = run_quick_tier(app.base, report_file, escalate_threshold)
+        timings['quick'] = time.perf_counter() - start
+        
+        if options.tier == 'auto':
+            # Escalate when the quick tier could not read the APK, too
+            run_deep = result is None or result['score'] >= options.escalate_threshold
+            decision = "escalating to deep tier" if run_deep else "skipping deep tier"
+            score = 'n/a' if result is None else result['score']
+            print_output(f"{Colors.BLUE}[*] Score {score} vs threshold {options.escalate_threshold}: {decision}{Colors.RESET}\n", report_file)
+    
+    if run_deep:
+        start = time.perf_counter()
+        completed = run_deep_tier(app, report_file, options, progress)
+        timings['deep'] = time.perf_counter() - start
+        if not completed:
+            return timings
+    
+    summary = ', '.join(f"{tier} {seconds:.3f}s" for tier, seconds in timings.items())
+    print_output(f"{Colors.BLUE}[*] Tier timings: {summary}{Colors.RESET}\n", report_file)
     print_output(f"{Colors.GREEN}[+] Completed analysis for {apk_name}{Colors.RESET}\n", report_file)
     print_output(f"{Colors.CYAN}----------------------------------------{Colors.RESET}\n", report_file)
+    return timings
+
+
+def process_single_apk(apk_path: str, report_file: Optional[str] = None, options: Optional[ScanOptions] = None):
+    """Process a single APK file or an .xapk/.apks bundle"""
+    apk_name = Path(apk_path).name
+    options = options or ScanOptions()
+    
+    print_output(f"{Colors.GREEN}[+] Processing single APK: {apk_name}...{Colors.RESET}\n", report_file)
+    
+    if not apk_path.lower().endswith(BUNDLE_SUFFIXES):
+        scan_apk(App(name=apk_name, base=apk_path), report_file, options)
+        return
+    
+    extract_dir = Path.cwd() / f'.temp_bundle_{Path(apk_path).stem}'
+    robust_remove_directory(extract_dir)
+    try:
+        apps = find_apps([apk_path], str(extract_dir))
+        for app in apps:
+            print_app_splits(app, report_file)
+            scan_apk(app, report_file, options)
+    finally:
+        robust_remove_directory(extract_dir)
 
 
-def process_folder(folder_path: str, report_file: Optional[str] = None):
+def print_app_splits(app: App, report_file: Optional[str] = None):
+    """List the splits that are scanned together with an app's base APK"""
+    if app.splits:
+        splits = ', '.join(Path(split).name for split in app.splits)
+        print_output(f"{Colors.BLUE}[*] {app.name}: base {Path(app.base).name} + {len(app.splits)} splits ({splits}){Colors.RESET}\n", report_file)
+
+
+def scan_apks_parallel(apps: list, report_file: Optional[str], options: ScanOptions):
+    """Scan apps concurrently under the scheduler, yielding each app's tier timings.
+    
+    Each APK writes to its own buffer file, which is copied to the report (or the
+    console) in one piece when the APK finishes so output never interleaves.
+    """
+    scheduler = options.scheduler
+    buffer_dir = Path(tempfile.mkdtemp(prefix='.scan_output_', dir=Path.cwd()))
+    output_lock = threading.Lock()
+    total = len(apps)
+    completed = 0
+    
+    def scan(index: int, app: App) -> dict:
+        buffer_file = str(buffer_dir / f'{index}.txt')
+        print_output(f"{Colors.GREEN}[+] Processing {app.name}...{Colors.RESET}\n", buffer_file)
+        print_app_splits(app, buffer_file)
+        try:
+            return scan_apk(app, buffer_file, options)
+        finally:
+            with output_lock:
+                with open(buffer_file, 'r', encoding='utf-8', errors='replace') as f:
+                    output = f.read()
+                if report_file:
+                    with open(report_file, 'a', encoding='utf-8') as f:
+                        f.write(output)
+                else:
+                    print(output, end='', flush=True)
+                os.remove(buffer_file)
+    
+    try:
+        # Enough threads for both pools to be full; the scheduler does the real limiting
+        with ThreadPoolExecutor(max_workers=scheduler.max_decompile + scheduler.max_analysis) as executor:
+            futures = [executor.submit(scan, index, app) for index, app in enumerate(apps)]
+            for future in as_completed(futures):
+                completed += 1
+                if report_file:
+                    display_progress(completed, total)
+                yield future.result()
+    finally:
+        robust_remove_directory(buffer_dir)
+
+
+def process_folder(folder_path: str, report_file: Optional[str] = None, options: Optional[ScanOptions] = None):
     """Process a folder containing APK files"""
     folder = Path(folder_path)
+    options = options or ScanOptions()
     
     print_output(f"{Colors.GREEN}[+] Processing folder: {folder_path}{Colors.RESET}\n", report_file)
     
-    # Find all APK files
-    apk_files = list(folder.glob('*.apk'))
+    # Find all APK files and bundles
+    apk_files = [path for path in folder.iterdir() if path.is_file() and path.suffix.lower() in APK_SUFFIXES]
     
     if not apk_files:
         print_output(f"{Colors.RED}[-] No APK files found in the specified folder.{Colors.RESET}\n", report_file)
         return
     
-    apk_count = len(apk_files)
-    print_output(f"{Colors.BLUE}[*] Found {apk_count} APK files to process{Colors.RESET}\n", report_file)
+    # Splits are grouped with their base APK so each app is decompiled and reported once
+    extract_dir = Path.cwd() / '.temp_bundles'
+    robust_remove_directory(extract_dir)
+    try:
+        apps = find_apps([str(apk_file) for apk_file in apk_files], str(extract_dir))
+        print_output(f"{Colors.BLUE}[*] Found {len(apk_files)} APK files to process ({len(apps)} apps){Colors.RESET}\n", report_file)
+        scan_apps(apps, report_file, options)
+    finally:
+        robust_remove_directory(extract_dir)
     
-    current = 0
+    if report_file:
+        print_output("\nProgress complete!\n", report_file)
+
+
+def scan_apps(apps: list, report_file: Optional[str], options: ScanOptions):
+    """Scan grouped apps sequentially or under the scheduler and print per-tier totals"""
+    apk_count = len(apps)
+    tier_totals = {}
+    
+    def record(timings):
+        for tier, seconds in timings.items():
+            total, count = tier_totals.get(tier, (0.0, 0))
+            tier_totals[tier] = (total + seconds, count + 1)
+    
+    if options.scheduler:
+        scheduler = options.scheduler
+        print_output(
+            f"{Colors.BLUE}[*] Parallel run: up to {scheduler.max_decompile} decompiles and "
+            f"{scheduler.max_analysis} analyses at once{Colors.RESET}\n",
+            report_file
+        )
+        for timings in scan_apks_parallel(apps, report_file, options):
+            record(timings)
+    else:
+        current = 0
+        for app in apps:
+            current += 1
+            
+            print_output(f"{Colors.GREEN}[+] Processing {app.name} ({current}/{apk_count})...{Colors.RESET}\n", report_file)
+            print_app_splits(app, report_file)
+            
+            record(scan_apk(app, report_file, options, (current, apk_count)))
     
-    for apk_file in apk_files:
-        current += 1
-        base_name = apk_file.stem
-        apk_name = apk_file.name
-        
-        print_output(f"{Colors.GREEN}[+] Processing {apk_name} ({current}/{apk_count})...{Colors.RESET}\n", report_file)
-        
-        # Create temp directory in current working directory
-        current_dir = Path.cwd()
-        target_app_dir = current_dir / f'.temp_{base_name}'
-        
-        # Remove existing directory if it exists
-        robust_remove_directory(target_app_dir)
-        
-        # Decompile APK
-        print_output(f"{Colors.BLUE}[*] Decompiling APK...{Colors.RESET}\n", report_file)
-        
-        if not decompile_apk(str(apk_file), str(target_app_dir)):
-            print_output(f"{Colors.RED}[-] Error: Failed to decompile {apk_name}{Colors.RESET}\n", report_file)
-            print_output(f"{Colors.CYAN}----------------------------------------{Colors.RESET}\n", report_file)
-            continue
-        
-        # Check if decompilation succeeded
-        manifest_path = target_app_dir / 'AndroidManifest.xml'
-        
-        if not manifest_path.exists():
-            print_output(f"{Colors.RED}[-] Error: Failed to decompile {apk_name}{Colors.RESET}\n", report_file)
-            print_output(f"{Colors.CYAN}----------------------------------------{Colors.RESET}\n", report_file)
-            continue
-        
-        # Run analysis scripts
-        if report_file:
-            display_progress(current, apk_count)
-        
-        run_analysis_scripts(str(target_app_dir), report_file)
-        
-        # Cleanup
-        print_output(f"{Colors.BLUE}[*] Cleaning up decompiled files...{Colors.RESET}\n", report_file)
-        robust_remove_directory(target_app_dir)
-        
-        print_output(f"{Colors.GREEN}[+] Completed analysis for {apk_name}{Colors.RESET}\n", report_file)
-        print_output(f"{Colors.CYAN}----------------------------------------{Colors.RESET}\n", report_file)
+    for tier, (total, count) in tier_totals.items():
+        print_output(f"{Colors.BLUE}[*] {tier} tier: {count} APKs in {total:.2f}s{Colors.RESET}\n", report_file)
+
+
+def format_finding(finding) -> str:
+    """Render a (check, kind, value) finding key for the diff report"""
+    check, kind, value = finding
+    if check == 'exported':
+        return f"EXPORTED {kind.upper()}: {value}"
+    if check == 'permission':
+        return f"PERMISSION: {value} (protectionLevel: {kind})"
+    if check == 'key':
+        return f"KEY ({kind}): {value}"
+    return f"{kind}: {value}"
+
+
+def process_diff(old_apk: str, new_apk: str, report_file: Optional[str] = None, state_dir: Optional[str] = None,
+                 max_states: int = DEFAULT_MAX_STATES):
+    """Compare two builds of an app and report new, fixed and unchanged findings"""
+    print_output(f"{Colors.GREEN}[+] Diffing {Path(old_apk).name} -> {Path(new_apk).name}{Colors.RESET}\n", report_file)
     
+    start = time.perf_counter()
+    current_dir = Path.cwd()
+    old_dir = current_dir / f'.temp_diff_old_{Path(old_apk).stem}'
+    new_dir = current_dir / f'.temp_diff_new_{Path(new_apk).stem}'
+    robust_remove_directory(old_dir)
+    robust_remove_directory(new_dir)
+    
+    def decompile(apk_path, output_dir, no_src, no_res):
+        skipped = [part for part, skip in (('smali', no_src), ('resources', no_res)) if skip]
+        note = f" (skipping unchanged {' and '.join(skipped)})" if skipped else ''
+        print_output(f"{Colors.BLUE}[*] Decompiling {Path(apk_path).name}{note}...{Colors.RESET}\n", report_file)
+        return decompile_apk(apk_path, output_dir, no_src=no_src, no_res=no_res)
+    
+    try:
+        result = diff_apks(old_apk, new_apk, str(old_dir), str(new_dir), decompile, state_dir, max_states)
+    except (RuntimeError, zipfile.BadZipFile, KeyError, ValueError, struct.error) as e:
+        print_output(f"{Colors.RED}[-] Error: {e}{Colors.RESET}\n", report_file)
+        return
+    finally:
+        robust_remove_directory(old_dir)
+        robust_remove_directory(new_dir)
+    
+    if result['old_from_state']:
+        print_output(f"{Colors.BLUE}[*] Reused the saved inventory and findings of {Path(old_apk).name} instead of decompiling it{Colors.RESET}\n", report_file)
+    print_output(
+        f"{Colors.BLUE}[*] Files: {len(result['added'])} added, {len(result['removed'])} removed, "
+        f"{len(result['modified'])} modified, {result['unchanged']} unchanged (not rescanned){Colors.RESET}\n",
+        report_file
+    )
+    
+    manifest_new, manifest_fixed, manifest_unchanged = result['manifest']
+    files_new, files_fixed, files_unchanged = result['files']
+    
+    for finding in manifest_new:
+        print_output(f"{Colors.RED}NEW    {format_finding(finding)}{Colors.RESET}\n", report_file)
+    for finding, path in files_new:
+        print_output(f"{Colors.RED}NEW    {format_finding(finding)} [{path}]{Colors.RESET}\n", report_file)
+    for finding in manifest_fixed:
+        print_output(f"{Colors.GREEN}FIXED  {format_finding(finding)}{Colors.RESET}\n", report_file)
+    for finding, path in files_fixed:
+        print_output(f"{Colors.GREEN}FIXED  {format_finding(finding)} [{path}]{Colors.RESET}\n", report_file)
+    
+    new_count = len(manifest_new) + len(files_new)
+    fixed_count = len(manifest_fixed) + len(files_fixed)
+    unchanged_count = len(manifest_unchanged) + len(files_unchanged)
+    print_output(
+        f"{Colors.MAGENTA}[*] Findings: {new_count} new, {fixed_count} fixed, {unchanged_count} unchanged "
+        f"in {time.perf_counter() - start:.2f}s{Colors.RESET}\n",
+        report_file
+    )
+    print_output(f"{Colors.CYAN}----------------------------------------{Colors.RESET}\n", report_file)
+
+
+def diff_main(argv: list):
+    """Entry point for 'apk_scanner.py diff OLD.apk NEW.apk'"""
+    parser = argparse.ArgumentParser(
+        prog='apk_scanner.py diff',
+        description='Analyze only the classes and resources that changed between two builds of an app'
+    )
+    parser.add_argument('old', help='APK of the previous build')
+    parser.add_argument('new', help='APK of the new build')
+    parser.add_argument('-r', '--report', metavar='FILE', help='Save output to specified report file')
+    parser.add_argument('--state-dir', metavar='DIR',
+                        help='Keep each build\'s file inventory and findings here so a later diff against it only '
+                             'decompiles the new build; the first diff into DIR decompiles and scans the new build in full')
+    parser.add_argument('--max-states', type=int, default=DEFAULT_MAX_STATES, metavar='N',
+                        help=f'Builds kept in --state-dir, least recently used deleted first (default: {DEFAULT_MAX_STATES})')
+    args = parser.parse_args(argv)
+    
+    report_file = args.report
     if report_file:
-        print_output("\nProgress complete!\n", report_file)
+        with open(report_file, 'w', encoding='utf-8') as f:
+            f.write('')
+        print(f"Output will be saved to {report_file}")
+    
+    print_banner(report_file)
+    
+    for apk in (args.old, args.new):
+        if not Path(apk).is_file():
+            print_output(f"{Colors.RED}[-] Error: '{apk}' does not exist{Colors.RESET}\n", report_file)
+            sys.exit(1)
+    
+    process_diff(args.old, args.new, report_file, args.state_dir, args.max_states)
+    
+    if report_file:
+        print(f"\nReport saved to: {report_file}")
 
 
 def main():
+    if sys.argv[1:2] == ['diff']:
+        diff_main(sys.argv[2:])
+        return
+    
     parser = argparse.ArgumentParser(
         description='APK Security Scanner - Cross-platform Python version',
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -326,11 +788,42 @@ Examples:
   python apk_scanner.py path/to/apk/folder
   python apk_scanner.py --report report.txt path/to/app.apk
   python apk_scanner.py -r report.txt path/to/apk/folder
+  python apk_scanner.py --dedup path/to/apk/folder
+  python apk_scanner.py --tier auto --escalate-threshold 8 path/to/apk/folder
+  python apk_scanner.py --jobs 8 path/to/huge.apk
+  python apk_scanner.py path/to/app.xapk
+  python apk_scanner.py --parallel --schedule-log schedule.jsonl path/to/apk/folder
+  python apk_scanner.py diff old.apk new.apk
         """
     )
     
     parser.add_argument('target', help='APK file or folder containing APK files')
     parser.add_argument('-r', '--report', metavar='FILE', help='Save output to specified report file')
+    parser.add_argument('--dedup', action='store_true',
+                        help='Scan each unique file content once per run and reuse the findings for identical files')
+    parser.add_argument('--tier', choices=['quick', 'deep', 'auto'], default='deep',
+                        help='quick: manifest checks and zip heuristics only; deep: full decompile and all checks; '
+                             'auto: quick tier, then deep tier when the risk score reaches the threshold (default: deep)')
+    parser.add_argument('--escalate-threshold', type=int, default=DEFAULT_ESCALATE_THRESHOLD, metavar='SCORE',
+                        help=f'Risk score at which --tier auto runs the deep tier (default: {DEFAULT_ESCALATE_THRESHOLD})')
+    parser.add_argument('--parallel', action='store_true',
+                        help='Scan a folder concurrently, admitting decompiles and analyses based on free RAM, load and disk')
+    parser.add_argument('--max-decompile', type=int, metavar='N',
+                        help='Upper bound on concurrent apktool runs with --parallel (default: half the CPUs)')
+    parser.add_argument('--max-analysis', type=int, metavar='N',
+                        help='Upper bound on concurrent analysis runs with --parallel (default: CPU count)')
+    parser.add_argument('--schedule-log', metavar='FILE', help='Log scheduling decisions as JSON lines to FILE')
+    parser.add_argument('--jobs', type=int, default=1, metavar='N',
+                        help='Worker processes for the key and endpoint scans within each APK (default: 1)')
+    parser.add_argument('--no-stream-assets', action='store_true',
+                        help='Scan assets/ and res/raw/ from the decompiled tree instead of streaming them from the APK')
+    parser.add_argument('--no-native-strings', action='store_true',
+                        help='Read native libraries as text in findkeys instead of extracting their ELF strings')
+    parser.add_argument('--no-resource-strings', action='store_true',
+                        help='Scan decoded res/values* files instead of the strings in resources.arsc')
+    parser.add_argument('--entropy-threshold', type=float, default=DEFAULT_ENTROPY_THRESHOLD, metavar='SCORE',
+                        help=f'Minimum confidence (0-1) for high-entropy string findings (default: {DEFAULT_ENTROPY_THRESHOLD})')
+    parser.add_argument('--no-entropy', action='store_true', help='Disable the high-entropy string detector')
     
     args = parser.parse_args()
     
@@ -352,21 +845,42 @@ Examples:
         print_output(f"{Colors.RED}[-] Error: '{args.target}' does not exist{Colors.RESET}\n", report_file)
         sys.exit(1)
     
+    # Findings cache shared by the file-level scripts for this run
+    cache_dir = None
+    if args.dedup:
+        cache_path = Path.cwd() / '.scan_cache'
+        robust_remove_directory(cache_path)
+        cache_path.mkdir()
+        cache_dir = str(cache_path)
+    
+    options = ScanOptions(cache_dir=cache_dir, tier=args.tier, escalate_threshold=args.escalate_threshold,
+                          jobs=args.jobs, stream_assets=not args.no_stream_assets,
+                          native_strings=not args.no_native_strings,
+                          resource_strings=not args.no_resource_strings,
+                          entropy_threshold=None if args.no_entropy else args.entropy_threshold)
+    if args.parallel:
+        configure_logging(args.schedule_log)
+        options.scheduler = ResourceScheduler(str(Path.cwd()), args.max_decompile, args.max_analysis)
+    
     # Process based on target type
     if target_path.is_file():
-        if target_path.suffix.lower() != '.apk':
+        if target_path.suffix.lower() not in APK_SUFFIXES:
             print_output(f"{Colors.RED}[-] Error: '{args.target}' is not a valid APK file{Colors.RESET}\n", report_file)
             sys.exit(1)
         
-        process_single_apk(str(target_path), report_file)
+        process_single_apk(str(target_path), report_file, options)
     
     elif target_path.is_dir():
-        process_folder(str(target_path), report_file)
+        process_folder(str(target_path), report_file, options)
     
     else:
         print_output(f"{Colors.RED}[-] Error: '{args.target}' is not a valid APK file or directory{Colors.RESET}\n", report_file)
         sys.exit(1)
     
+    if cache_dir:
+        print_dedup_stats(cache_dir, report_file)
+        robust_remove_directory(Path(cache_dir))
+    
     print_output(f"{Colors.GREEN}[+] All APK scanning operations completed!{Colors.RESET}\n", report_file)
     
     if report_file:
@@ -0,0 +1,320 @@
+"""
+Version diff: analyze only what changed between two builds of the same app.
+
+The zip central directories are compared first (CRCs are free to read), so
+apktool is told to skip smali when no dex changed and to skip resource
+decoding when no resource changed. The decompiled trees are then inventoried
+by content hash and the file-level checks run only on added, removed and
+modified files. A finding only counts as new or fixed when its value is not in
+the files both builds share. Manifest models are decoded from both APKs
+directly and compared as sets.
+
+With a state directory (opt-in), each build's inventory and per-file
+findings are saved under the APK's SHA-256, so diffing against a build seen
+before only decompiles the new one. Only the most recently used states are
+kept.
+"""
+
+import hashlib
+import json
+import os
+import zipfile
+
+import axml
+from exported import find_exported_components
+from findendpoints import extract_urls_from_content, is_interesting_file
+from findkeys import scan_content
+from permissions import find_permissions
+from triage import DEX_PATTERN
+
+# apktool bookkeeping that differs between runs without meaning anything
+IGNORED_ENTRIES = ('apktool.yml', 'original/')
+# Bumped whenever the saved findings would no longer match a fresh scan
+STATE_VERSION = 1
+# Saved builds kept per state directory; the least recently used are deleted
+DEFAULT_MAX_STATES = 20
+HASH_BLOCK = 1 << 20
+
+
+def _entry_crcs(apk_path):
+    with zipfile.ZipFile(apk_path) as apk:
+        return {info.filename: info.CRC for info in apk.infolist() if not info.is_dir()}
+
+
+def zip_changes(old_apk, new_apk):
+    """Return (code_changed, resources_changed, other_changed) from the two zip directories"""
+    old_crcs = _entry_crcs(old_apk)
+    new_crcs = _entry_crcs(new_apk)
+    changed = {name for name in old_crcs.keys() | new_crcs.keys() if old_crcs.get(name) != new_crcs.get(name)}
+
+    code = {name for name in changed if name.startswith('classes') and name.endswith('.dex')}
+    resources = {name for name in changed if name == 'resources.arsc' or name.startswith('res/')}
+    # Signatures always change and the manifest is compared separately
+    other = {name for name in changed - code - resources
+             if name != 'AndroidManifest.xml' and not name.startswith('META-INF/')}
+    return bool(code), bool(resources), bool(other)
+
+
+def part_of(relative_path):
+    """Return the part of apktool's output a path belongs to: 'code', 'resources' or 'other'.
+
+    Raw classes*.dex (kept with -s) count as code and raw res/ (kept with -r)
+    as resources, so a skipped part never shows up as added files.
+    """
+    if relative_path.startswith('smali') or DEX_PATTERN.match(relative_path):
+        return 'code'
+    if relative_path.startswith('res/') or relative_path in ('resources.arsc', 'AndroidManifest.xml'):
+        return 'resources'
+    return 'other'
+
+
+def iter_files(app_dir):
+    """Yield the path relative to app_dir of every file apktool produced, skipping its bookkeeping"""
+    for root, dirs, files in os.walk(app_dir):
+        for file in files:
+            relative_path = os.path.relpath(os.path.join(root, file), app_dir).replace('\\', '/')
+            if not relative_path.startswith(IGNORED_ENTRIES):
+                yield relative_path
+
+
+def _file_digest(path, algorithm='sha1'):
+    digest = hashlib.new(algorithm)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def build_inventory(app_dir, parts=('code', 'resources', 'other')):
+    """Map each file's path relative to app_dir to the SHA-1 of its contents, for the given parts"""
+    return {relative_path: _file_digest(os.path.join(app_dir, relative_path))
+            for relative_path in iter_files(app_dir) if part_of(relative_path) in parts}
+
+
+def diff_inventories(old_inventory, new_inventory):
+    """Split paths into added, removed, modified and unchanged lists"""
+    added = sorted(new_inventory.keys() - old_inventory.keys())
+    removed = sorted(old_inventory.keys() - new_inventory.keys())
+    common = old_inventory.keys() & new_inventory.keys()
+    modified = sorted(path for path in common if old_inventory[path] != new_inventory[path])
+    unchanged = len(common) - len(modified)
+    return added, removed, modified, unchanged
+
+
+def scan_path(app_dir, relative_path):
+    """Run the key and endpoint rules on one file and return its sorted (check, kind, value) findings"""
+    path = os.path.join(app_dir, relative_path)
+    try:
+        with open(path, 'rb') as f:
+            content = f.read().decode('utf-8', errors='ignore')
+    except OSError:
+        return []
+
+    findings = set()
+    for name, match in scan_content(content):
+        # Multi-group rules report their first non-empty group
+        value = match if isinstance(match, str) else next((group for group in match if group), '')
+        if value:
+            findings.add(('key', name, value))
+    if is_interesting_file(path):
+        for kind, urls in extract_urls_from_content(content, path).items():
+            for url in urls:
+                findings.add(('endpoint', kind, url))
+    return sorted(findings)
+
+
+def values_present(app_dir, relative_paths, values):
+    """Return the values that occur verbatim in at least one of the given files"""
+    remaining = {value: value.encode('utf-8') for value in values}
+    present = set()
+    for relative_path in relative_paths:
+        if not remaining:
+            break
+        try:
+            with open(os.path.join(app_dir, relative_path), 'rb') as f:
+                data = f.read()
+        except OSError:
+            continue
+        for value, encoded in list(remaining.items()):
+            if encoded in data:
+                present.add(value)
+                del remaining[value]
+    return present
+
+
+def apk_digest(apk_path):
+    return _file_digest(apk_path, 'sha256')
+
+
+def load_state(state_dir, apk_path):
+    """Return the saved {relative path: (sha1, findings)} of a build, or None when there is none"""
+    path = os.path.join(state_dir, f'{apk_digest(apk_path)}.json')
+    try:
+        with open(path, encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if state.get('version') != STATE_VERSION:
+        return None
+    # Mark the state as recently used so pruning keeps it
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return {path: (digest, [tuple(finding) for finding in findings])
+            for path, (digest, findings) in state['files'].items()}
+
+
+def save_state(state_dir, apk_path, files, max_states=DEFAULT_MAX_STATES):
+    """Save {relative path: (sha1, findings)} for a build so later diffs need not decompile it.
+
+    Keeps at most max_states saved builds in state_dir, deleting the least recently used.
+    """
+    os.makedirs(state_dir, exist_ok=True)
+    target = os.path.join(state_dir, f'{apk_digest(apk_path)}.json')
+    with open(target + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump({'version': STATE_VERSION, 'files': files}, f)
+    os.replace(target + '.tmp', target)
+    prune_states(state_dir, max_states)
+
+
+def prune_states(state_dir, max_states=DEFAULT_MAX_STATES):
+    """Delete all but the max_states most recently used state files in state_dir"""
+    states = []
+    for name in os.listdir(state_dir):
+        if name.endswith('.json'):
+            path = os.path.join(state_dir, name)
+            try:
+                states.append((os.path.getmtime(path), path))
+            except OSError:
+                continue
+    for _, path in sorted(states, reverse=True)[max_states:]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def manifest_findings(apk_path):
+    """Decode the APK's manifest in memory and return its findings as a set"""
+    with zipfile.ZipFile(apk_path) as apk:
+        manifest_content = axml.decode_xml(apk.read('AndroidManifest.xml'))
+
+    findings = set()
+    for component, names in find_exported_components(manifest_content).items():
+        for name in names:
+            findings.add(('exported', component, name))
+    for name, protection_level in find_permissions(manifest_content):
+        findings.add(('permission', protection_level, name))
+    return findings
+
+
+def compare_findings(old_findings, new_findings, present=frozenset()):
+    """Return sorted (new, fixed, unchanged) finding keys.
+
+    Findings whose value is in present (still found in files both builds
+    share) were neither introduced nor removed, so they count as unchanged.
+    """
+    old_keys = set(old_findings)
+    new_keys = set(new_findings)
+    moved = {finding for finding in old_keys ^ new_keys if finding[2] in present}
+    return (sorted(new_keys - old_keys - moved), sorted(old_keys - new_keys - moved),
+            sorted((old_keys & new_keys) | moved))
+
+
+def diff_apks(old_apk, new_apk, old_dir, new_dir, decompile, state_dir=None, max_states=DEFAULT_MAX_STATES):
+    """Diff two builds and return the changed files and new/fixed/unchanged findings.
+
+    decompile(apk_path, output_dir, no_src, no_res) must return True on success;
+    it is skipped entirely when only the manifest or signatures changed, and
+    for the old build when state_dir holds its saved state. With state_dir the
+    new build's state is saved too; when the old build has none yet, all of
+    the new build is decompiled and scanned once and both states are saved.
+    Without state_dir only the changed parts are decompiled and scanned.
+    """
+    code_changed, resources_changed, other_changed = zip_changes(old_apk, new_apk)
+    result = {
+        'code_changed': code_changed,
+        'resources_changed': resources_changed,
+        'added': [], 'removed': [], 'modified': [], 'unchanged': 0,
+    }
+
+    old_manifest = manifest_findings(old_apk)
+    new_manifest = manifest_findings(new_apk)
+    result['manifest'] = compare_findings(old_manifest, new_manifest)
+
+    old_state = load_state(state_dir, old_apk) if state_dir else None
+    result['old_from_state'] = old_state is not None
+    old_files, new_files, present = {}, {}, set()
+    new_state = dict(old_state) if old_state is not None else None
+    if code_changed or resources_changed or other_changed:
+        parts = ['other'] + ['code'] * code_changed + ['resources'] * resources_changed
+        # Without an old state, the new build's state can only be complete if nothing of it is skipped
+        seed = bool(state_dir) and old_state is None
+        builds = ((new_apk, new_dir),) if old_state is not None else ((old_apk, old_dir), (new_apk, new_dir))
+        for apk_path, output_dir in builds:
+            full = seed and apk_path == new_apk
+            if not decompile(apk_path, output_dir, not (code_changed or full), not (resources_changed or full)):
+                raise RuntimeError(f'Failed to decompile {os.path.basename(apk_path)}')
+
+        full_inventory = build_inventory(new_dir, ('code', 'resources', 'other') if seed else parts)
+        new_inventory = {path: digest for path, digest in full_inventory.items() if part_of(path) in parts}
+        if old_state is not None:
+            old_inventory = {path: digest for path, (digest, _) in old_state.items() if part_of(path) in parts}
+        else:
+            old_inventory = build_inventory(old_dir, parts)
+        added, removed, modified, unchanged = diff_inventories(old_inventory, new_inventory)
+        result.update(added=added, removed=removed, modified=modified, unchanged=unchanged)
+
+        if old_state is not None:
+            old_scanned = {path: old_state[path][1] for path in removed + modified}
+        else:
+            old_scanned = {path: scan_path(old_dir, path) for path in removed + modified}
+        scanned = {path: scan_path(new_dir, path) for path in added + modified}
+        for files, per_path in ((old_files, old_scanned), (new_files, scanned)):
+            for path, findings in per_path.items():
+                for finding in findings:
+                    files.setdefault(finding, path)
+
+        # Everything else in the new tree, including raw parts apktool skipped, is shared by both builds
+        changed = set(added) | set(modified)
+        shared = [path for path in iter_files(new_dir) if path not in changed]
+        present = values_present(new_dir, shared, {finding[2] for finding in old_files.keys() ^ new_files.keys()})
+
+        if state_dir:
+            new_state = _next_state(old_state, new_dir, full_inventory, scanned, parts)
+        if seed:
+            # The old build differs from the new one only in the files just diffed
+            seeded = {path: entry for path, entry in new_state.items() if path not in changed}
+            seeded.update((path, (old_inventory[path], old_scanned[path])) for path in removed + modified)
+            save_state(state_dir, old_apk, seeded, max_states)
+
+    if state_dir and new_state is not None:
+        save_state(state_dir, new_apk, new_state, max_states)
+
+    new, fixed, unchanged = compare_findings(old_files, new_files, present)
+    result['files'] = (
+        [(finding, new_files[finding]) for finding in new],
+        [(finding, old_files[finding]) for finding in fixed],
+        [(finding, new_files.get(finding) or old_files[finding]) for finding in unchanged],
+    )
+    return result
+
+
+def _next_state(old_state, new_dir, new_inventory, scanned, parts):
+    """Build the new build's {path: (sha1, findings)}.
+
+    Parts apktool skipped are identical to the old build's and are copied from
+    its state; unchanged files reuse the old findings or, without an old
+    state (new_inventory then covers every part), are scanned here.
+    """
+    state = {path: entry for path, entry in (old_state or {}).items() if part_of(path) not in parts}
+    for path, digest in new_inventory.items():
+        if path in scanned:
+            findings = scanned[path]
+        elif old_state is not None and path in old_state:
+            findings = old_state[path][1]
+        else:
+            findings = scan_path(new_dir, path)
+        state[path] = (digest, findings)
+    return state
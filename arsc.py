@@ -0,0 +1,238 @@
+"""
+Direct resources.arsc scanning for resource-level secrets.
+
+Strings defined in res/values*/ end up in the compiled resource table: one
+global string pool plus, per package, type and key pools and a table of
+entries for every configuration (locale, density, ...). This reads the table
+straight from the APK zip, collects the string-typed entries (including items
+of arrays and plurals) with their resource names and configs, and runs the
+findkeys, entropy and findendpoints rules once per unique name and value
+instead of once per decoded values file per locale.
+"""
+
+import argparse
+import struct
+import sys
+import zipfile
+import zlib
+from colorama import Fore, Style, init
+from axml import NO_INDEX, RES_STRING_POOL_TYPE, TYPE_STRING, parse_string_pool
+from elfstrings import scan_strings
+from entropy import DEFAULT_THRESHOLD
+
+RES_TABLE_TYPE = 0x0002
+RES_TABLE_PACKAGE_TYPE = 0x0200
+RES_TABLE_TYPE_TYPE = 0x0201
+
+# ResTable_type flags
+FLAG_SPARSE = 0x01
+FLAG_OFFSET16 = 0x02
+NO_ENTRY16 = 0xFFFF
+# ResTable_entry flags
+FLAG_COMPLEX = 0x0001
+FLAG_COMPACT = 0x0008
+
+DENSITIES = {120: 'ldpi', 160: 'mdpi', 213: 'tvdpi', 240: 'hdpi', 320: 'xhdpi', 480: 'xxhdpi',
+             640: 'xxxhdpi', 0xFFFE: 'anydpi', 0xFFFF: 'nodpi'}
+UI_MODE_NIGHT = {0x10: 'notnight', 0x20: 'night'}
+
+
+def _unpack_locale(data, base):
+    """Decode a packed ResTable_config language or region code"""
+    first, second = data[0], data[1]
+    if not first:
+        return ''
+    if first & 0x80:
+        # Three-letter code packed into 15 bits
+        return ''.join(chr(base + value) for value in
+                       (second & 0x1F, ((second & 0xE0) >> 5) | ((first & 0x03) << 3), (first & 0x7C) >> 2))
+    return chr(first) + chr(second)
+
+
+def format_config(data, offset):
+    """Render the ResTable_config at offset as apktool-style qualifiers ('default' when empty)"""
+    size = struct.unpack_from('<I', data, offset)[0]
+    config = data[offset:offset + size].ljust(36, b'\0')
+    mcc, mnc = struct.unpack_from('<HH', config, 4)
+    density, = struct.unpack_from('<H', config, 14)
+    sdk_version, = struct.unpack_from('<H', config, 24)
+    ui_mode = config[29]
+    smallest_width, width, height = struct.unpack_from('<HHH', config, 30)
+
+    qualifiers = []
+    if mcc:
+        qualifiers.append(f'mcc{mcc}')
+    if mnc:
+        qualifiers.append(f'mnc{mnc}')
+    language = _unpack_locale(config[8:10], ord('a'))
+    if language:
+        qualifiers.append(language)
+        region = _unpack_locale(config[10:12], ord('0'))
+        if region:
+            qualifiers.append(f'r{region}')
+    if smallest_width:
+        qualifiers.append(f'sw{smallest_width}dp')
+    if width:
+        qualifiers.append(f'w{width}dp')
+    if height:
+        qualifiers.append(f'h{height}dp')
+    if ui_mode & 0x30 in UI_MODE_NIGHT:
+        qualifiers.append(UI_MODE_NIGHT[ui_mode & 0x30])
+    if density in DENSITIES:
+        qualifiers.append(DENSITIES[density])
+    elif density:
+        qualifiers.append(f'{density}dpi')
+    if sdk_version:
+        qualifiers.append(f'v{sdk_version}')
+    return '-'.join(qualifiers) or 'default'
+
+
+def _entry_offsets(data, chunk, header_size, flags, entry_count):
+    """Yield (entry index, offset from entriesStart) for the present entries of a type chunk"""
+    table = chunk + header_size
+    if flags & FLAG_SPARSE:
+        for index in range(entry_count):
+            entry_index, offset = struct.unpack_from('<HH', data, table + index * 4)
+            yield entry_index, offset * 4
+    elif flags & FLAG_OFFSET16:
+        for index, offset in enumerate(struct.unpack_from(f'<{entry_count}H', data, table)):
+            if offset != NO_ENTRY16:
+                yield index, offset * 4
+    else:
+        for index, offset in enumerate(struct.unpack_from(f'<{entry_count}I', data, table)):
+            if offset != NO_INDEX:
+                yield index, offset
+
+
+def _entry_strings(data, position):
+    """Return (key index, [global pool indices of string values]) for the entry at position"""
+    size, flags = struct.unpack_from('<HH', data, position)
+    if flags & FLAG_COMPACT:
+        # Compact entries keep the key index in size and the value type in the high byte of flags
+        value, = struct.unpack_from('<I', data, position + 4)
+        return size, [value] if flags >> 8 == TYPE_STRING else []
+
+    key, = struct.unpack_from('<I', data, position + 4)
+    if flags & FLAG_COMPLEX:
+        count, = struct.unpack_from('<I', data, position + 12)
+        values = []
+        for item in range(count):
+            _, _, _, data_type, value = struct.unpack_from('<IHBBI', data, position + size + item * 12)
+            if data_type == TYPE_STRING:
+                values.append(value)
+        return key, values
+
+    _, _, data_type, value = struct.unpack_from('<HBBI', data, position + size)
+    return key, [value] if data_type == TYPE_STRING else []
+
+
+def _iter_package_strings(data, package, global_strings):
+    chunk_type, header_size, package_size = struct.unpack_from('<HHI', data, package)
+    type_strings_offset, _, key_strings_offset = struct.unpack_from('<III', data, package + 268)
+    type_names = parse_string_pool(data, package + type_strings_offset)
+    key_names = parse_string_pool(data, package + key_strings_offset)
+
+    chunk = package + header_size
+    end = package + package_size
+    while chunk < end:
+        chunk_type, chunk_header_size, chunk_size = struct.unpack_from('<HHI', data, chunk)
+        if chunk_size < 8:
+            raise ValueError(f'Invalid chunk size at {chunk:#x}')
+        if chunk_type == RES_TABLE_TYPE_TYPE:
+            type_id, flags, _, entry_count, entries_start = struct.unpack_from('<BBHII', data, chunk + 8)
+            type_name = type_names[type_id - 1]
+            config = format_config(data, chunk + 20)
+            for _, offset in _entry_offsets(data, chunk, chunk_header_size, flags, entry_count):
+                key, values = _entry_strings(data, chunk + entries_start + offset)
+                for value in values:
+                    if value < len(global_strings):
+                        yield f'@{type_name}/{key_names[key]}', config, global_strings[value]
+        chunk += chunk_size
+
+
+def iter_resource_strings(data):
+    """Yield (resource name, config, string) for every string-typed entry in a resources.arsc"""
+    chunk_type, header_size, table_size, _ = struct.unpack_from('<HHII', data, 0)
+    if chunk_type != RES_TABLE_TYPE:
+        raise ValueError(f'Not a resource table (chunk type {chunk_type:#x})')
+
+    global_strings = []
+    chunk = header_size
+    while chunk < min(table_size, len(data)):
+        chunk_type, _, chunk_size = struct.unpack_from('<HHI', data, chunk)
+        if chunk_size < 8:
+            raise ValueError(f'Invalid chunk size at {chunk:#x}')
+        if chunk_type == RES_STRING_POOL_TYPE:
+            global_strings = parse_string_pool(data, chunk)
+        elif chunk_type == RES_TABLE_PACKAGE_TYPE:
+            yield from _iter_package_strings(data, chunk, global_strings)
+        chunk += chunk_size
+
+
+def collect_resource_strings(apk_path, resources=None):
+    """Add the APK's string resources to resources and return it.
+
+    resources maps string -> {resource name: [configs]}, so a value repeated
+    across locales or splits is scanned once and still reported everywhere.
+    """
+    resources = {} if resources is None else resources
+    with zipfile.ZipFile(apk_path) as apk:
+        try:
+            data = apk.read('resources.arsc')
+        except KeyError:
+            return resources
+
+    for name, config, value in iter_resource_strings(data):
+        configs = resources.setdefault(value, {}).setdefault(name, [])
+        if config not in configs:
+            configs.append(config)
+    return resources
+
+
+def describe(names):
+    """Format {resource name: [configs]} as '@string/a [default, fr], @string/b [de]'"""
+    return ', '.join(f"{name} [{', '.join(configs)}]" for name, configs in names.items())
+
+
+def main(apk_paths, entropy_threshold=DEFAULT_THRESHOLD):
+    """Scan the APKs' string resources and return True when every resources.arsc could be read"""
+    resources = {}
+    readable = True
+    for apk_path in apk_paths:
+        try:
+            collect_resource_strings(apk_path, resources)
+        except (OSError, ValueError, IndexError, struct.error, zipfile.BadZipFile, zlib.error, EOFError) as e:
+            print(Fore.RED + f"Cannot read resources.arsc in {apk_path}: {e}" + Style.RESET_ALL)
+            readable = False
+
+    # One entry per resource name holding the value, for the rules keyed on names like google_api_key
+    entries = [(name, value) for value, names in resources.items() for name in names]
+    endpoints = []
+    for check, kind, value, index in scan_strings([value for _, value in entries], entropy_threshold,
+                                                  [name for name, _ in entries]):
+        where = f"resources.arsc {describe(resources[entries[index][1]])}"
+        if check == 'key':
+            print(Fore.CYAN + Style.BRIGHT + f"KEY FOUND ({kind} in {where}): {value}" + Style.RESET_ALL)
+        else:
+            endpoints.append((kind, value, where))
+
+    if endpoints:
+        print(Fore.CYAN + Style.BRIGHT + "\n=== URLS AND API ENDPOINTS FOUND IN RESOURCES ===" + Style.RESET_ALL)
+        for kind, url, where in endpoints:
+            print(f"{Fore.GREEN}{kind}:{Style.RESET_ALL} {Fore.WHITE}{url}{Style.RESET_ALL}")
+            print(f"  {Fore.YELLOW}Found in: {where}{Style.RESET_ALL}")
+    return readable
+
+
+if __name__ == "__main__":
+    init(autoreset=True)
+
+    parser = argparse.ArgumentParser(description='Check string resources in resources.arsc for keys and endpoints')
+    parser.add_argument('apks', nargs='+', help='APK files (the base and splits of one app)')
+    parser.add_argument('--entropy-threshold', type=float, default=DEFAULT_THRESHOLD, metavar='SCORE',
+                        help=f'Minimum confidence (0-1) for high-entropy string findings (default: {DEFAULT_THRESHOLD})')
+    parser.add_argument('--no-entropy', action='store_true', help='Disable the high-entropy string detector')
+    args = parser.parse_args()
+
+    # Exit status 1 tells apk_scanner.py to scan the decoded res/values*/ files as well
+    sys.exit(0 if main(args.apks, None if args.no_entropy else args.entropy_threshold) else 1)
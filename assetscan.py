@@ -0,0 +1,194 @@
+"""
+Streaming scan of assets/ and res/raw/ straight from the APK zip.
+
+apktool copies these directories unchanged, so there is no reason to wait for
+the decompile and read them back from disk. Each entry is decompressed in
+fixed-size blocks (with a small overlap so matches across a block boundary are
+not lost) and the findkeys and findendpoints rules run on every block. Dex
+and class files are scanned as text (their string tables are plain text),
+native libraries through their ELF .rodata/.data strings. Zip, jar, aar and
+apk files found inside are opened in place and scanned the same way, down to
+a depth limit.
+"""
+
+import argparse
+import io
+import sys
+import zipfile
+import zlib
+from colorama import Fore, Style, init
+from elfstrings import iter_strings, scan_strings
+from entropy import DEFAULT_THRESHOLD
+from findendpoints import classify_token, token_pattern
+from findkeys import scan_content
+
+STREAMED_PREFIXES = ('assets/', 'res/raw/')
+ARCHIVE_EXTENSIONS = ('.zip', '.jar', '.aar', '.apk')
+# Media and fonts: no text rules apply
+SKIPPED_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.webp', '.ico', '.bmp', '.mp3', '.mp4', '.ogg',
+                      '.wav', '.m4a', '.ttf', '.otf', '.woff', '.woff2')
+LIBRARY_EXTENSION = '.so'
+BLOCK_SIZE = 1 << 20
+# Carried into the next block; long enough for a PEM private key
+OVERLAP = 8 << 10
+DEFAULT_MAX_DEPTH = 2
+# Raised while reading a corrupt, encrypted or unsupported zip member
+READ_ERRORS = (zipfile.BadZipFile, NotImplementedError, RuntimeError, zlib.error, EOFError)
+
+
+def iter_blocks(stream):
+    """Yield (text, limit) for decoded blocks of at most BLOCK_SIZE + OVERLAP bytes.
+
+    limit is where the trailing overlap starts, or None for the last block. The
+    next block starts at the overlap, so matches starting at or after limit are
+    seen there in full and may be cut short here.
+    """
+    tail = b''
+    block = stream.read(BLOCK_SIZE)
+    while block:
+        data = tail + block
+        block = stream.read(BLOCK_SIZE)
+        if not block:
+            yield data.decode('utf-8', errors='ignore'), None
+            return
+        yield data.decode('utf-8', errors='ignore'), len(data[:-OVERLAP].decode('utf-8', errors='ignore'))
+        tail = data[-OVERLAP:]
+
+
+def scan_stream(stream, entropy_threshold=DEFAULT_THRESHOLD):
+    """Run the key and endpoint rules over a stream; returns (keys, endpoints).
+
+    keys is a list of (rule name, match) and endpoints a {kind: set of URLs} map,
+    both free of the duplicates the block overlap produces.
+    """
+    keys = []
+    seen = set()
+    endpoints = {}
+    for text, limit in iter_blocks(stream):
+        for name, match in scan_content(text, entropy_threshold):
+            value = match if isinstance(match, str) else next((group for group in match if group), '')
+            if match in seen or (limit is not None and text.find(value) >= limit):
+                continue
+            seen.add(match)
+            keys.append((name, match))
+        for token in token_pattern.finditer(text):
+            if limit is not None and token.start() >= limit:
+                break
+            kinds, url = classify_token(token)
+            for kind in kinds:
+                endpoints.setdefault(kind, set()).add(url)
+    return keys, endpoints
+
+
+def scan_library(member, entropy_threshold=DEFAULT_THRESHOLD):
+    """Run the key and endpoint rules over the .rodata/.data strings of a native library.
+
+    Returns (keys, endpoints) like scan_stream. Files that are not ELF
+    libraries are scanned as text instead.
+    """
+    data = member.read()
+    try:
+        strings = list(dict.fromkeys(value for _, _, value in iter_strings(data)))
+    except ValueError:
+        return scan_stream(io.BytesIO(data), entropy_threshold)
+
+    keys = []
+    endpoints = {}
+    for check, kind, value, _ in scan_strings(strings, entropy_threshold):
+        if check == 'key':
+            keys.append((kind, value))
+        else:
+            endpoints.setdefault(kind, set()).add(value)
+    return keys, endpoints
+
+
+def scan_archive(archive, location, entropy_threshold=DEFAULT_THRESHOLD, max_depth=DEFAULT_MAX_DEPTH,
+                 prefixes=STREAMED_PREFIXES, depth=0, errors=None):
+    """Yield (entry path, keys, endpoints) for every scannable entry of an open ZipFile.
+
+    Only entries under prefixes are read at the top level; nested archives are
+    scanned in full. Entry paths look like app.apk!/assets/sdk.jar!/config.json.
+    Entries that cannot be read are skipped and (entry path, error) is appended
+    to errors when it is given.
+    """
+    for info in archive.infolist():
+        name = info.filename
+        if info.is_dir() or (prefixes and not name.startswith(prefixes)):
+            continue
+        path = f'{location}!/{name}'
+        lower_name = name.lower()
+
+        if lower_name.endswith(ARCHIVE_EXTENSIONS):
+            if depth >= max_depth:
+                continue
+            try:
+                # Zip members are seekable, so the nested archive is read in place
+                with archive.open(info) as member, zipfile.ZipFile(member) as nested:
+                    yield from scan_archive(nested, path, entropy_threshold, max_depth, None, depth + 1, errors)
+            except READ_ERRORS as e:
+                # Not really a zip, corrupt, encrypted or an unsupported compression method
+                if errors is not None:
+                    errors.append((path, e))
+            continue
+
+        if lower_name.endswith(SKIPPED_EXTENSIONS):
+            continue
+        try:
+            with archive.open(info) as member:
+                if lower_name.endswith(LIBRARY_EXTENSION):
+                    keys, endpoints = scan_library(member, entropy_threshold)
+                else:
+                    keys, endpoints = scan_stream(member, entropy_threshold)
+        except READ_ERRORS as e:
+            if errors is not None:
+                errors.append((path, e))
+            continue
+        yield path, keys, endpoints
+
+
+def main(apk_paths, entropy_threshold=DEFAULT_THRESHOLD, max_depth=DEFAULT_MAX_DEPTH):
+    """Scan the APKs and return True when every entry could be read"""
+    seen_endpoints = set()
+    errors = []
+
+    for apk_path in apk_paths:
+        try:
+            apk = zipfile.ZipFile(apk_path)
+        except (OSError, zipfile.BadZipFile) as e:
+            errors.append((apk_path, e))
+            continue
+
+        with apk:
+            for path, keys, endpoints in scan_archive(apk, apk_path, entropy_threshold, max_depth, errors=errors):
+                for name, match in keys:
+                    print(Fore.CYAN + Style.BRIGHT + f"KEY FOUND ({name} in {path}): {match}" + Style.RESET_ALL)
+
+                for pattern_name, urls in endpoints.items():
+                    for url in sorted(urls):
+                        if (pattern_name, url) in seen_endpoints:
+                            continue
+                        seen_endpoints.add((pattern_name, url))
+                        if len(seen_endpoints) == 1:
+                            print(Fore.CYAN + Style.BRIGHT + "\n=== URLS AND API ENDPOINTS FOUND IN ASSETS ===" + Style.RESET_ALL)
+                        print(f"{Fore.GREEN}{pattern_name}:{Style.RESET_ALL} {Fore.WHITE}{url}{Style.RESET_ALL}")
+                        print(f"  {Fore.YELLOW}Found in: {path}{Style.RESET_ALL}")
+
+    for path, e in errors:
+        print(Fore.RED + f"Cannot read {path}: {e}" + Style.RESET_ALL)
+    return not errors
+
+
+if __name__ == "__main__":
+    init(autoreset=True)
+
+    parser = argparse.ArgumentParser(description='Scan assets/ and res/raw/ for keys and endpoints without extracting the APK')
+    parser.add_argument('apks', nargs='+', help='APK files (the base and splits of one app)')
+    parser.add_argument('--max-depth', type=int, default=DEFAULT_MAX_DEPTH, metavar='N',
+                        help=f'How many levels of nested zip/jar archives to open (default: {DEFAULT_MAX_DEPTH})')
+    parser.add_argument('--entropy-threshold', type=float, default=DEFAULT_THRESHOLD, metavar='SCORE',
+                        help=f'Minimum confidence (0-1) for high-entropy string findings (default: {DEFAULT_THRESHOLD})')
+    parser.add_argument('--no-entropy', action='store_true', help='Disable the high-entropy string detector')
+    args = parser.parse_args()
+
+    # Exit status 1 tells apk_scanner.py to scan assets/ and res/raw/ from the decompiled tree as well
+    sys.exit(0 if main(args.apks, None if args.no_entropy else args.entropy_threshold, args.max_depth) else 1)
@@ -0,0 +1,236 @@
+"""
+Minimal decoder for Android's binary XML (AXML) and resource string pools.
+
+Reads AndroidManifest.xml and res/xml files straight from the APK zip and
+renders them as XML text close to apktool's output, so the manifest-level
+checks can run without decompiling. Attributes are written in alphabetical
+order, which is what the checks' regexes expect.
+"""
+
+import struct
+
+# Chunk types
+RES_STRING_POOL_TYPE = 0x0001
+RES_XML_TYPE = 0x0003
+RES_XML_START_NAMESPACE_TYPE = 0x0100
+RES_XML_END_NAMESPACE_TYPE = 0x0101
+RES_XML_START_ELEMENT_TYPE = 0x0102
+RES_XML_END_ELEMENT_TYPE = 0x0103
+RES_XML_CDATA_TYPE = 0x0104
+RES_XML_RESOURCE_MAP_TYPE = 0x0180
+
+UTF8_FLAG = 1 << 8
+NO_INDEX = 0xFFFFFFFF
+
+# Res_value data types
+TYPE_REFERENCE = 0x01
+TYPE_ATTRIBUTE = 0x02
+TYPE_STRING = 0x03
+TYPE_FLOAT = 0x04
+TYPE_INT_DEC = 0x10
+TYPE_INT_HEX = 0x11
+TYPE_INT_BOOLEAN = 0x12
+
+ANDROID_NS = 'http://schemas.android.com/apk/res/android'
+
+# Framework attribute IDs, used when obfuscators blank out attribute names
+ANDROID_ATTRIBUTES = {
+    0x01010001: 'label',
+    0x01010003: 'name',
+    0x01010006: 'permission',
+    0x01010009: 'protectionLevel',
+    0x0101000f: 'debuggable',
+    0x01010010: 'exported',
+    0x01010018: 'authorities',
+    0x0101001b: 'grantUriPermissions',
+    0x0101002a: 'path',
+    0x0101002b: 'pathPrefix',
+    0x0101002c: 'pathPattern',
+    0x01010026: 'mimeType',
+    0x01010027: 'scheme',
+    0x01010028: 'host',
+    0x01010280: 'allowBackup',
+    0x0101021b: 'versionCode',
+    0x0101021c: 'versionName',
+    0x0101020c: 'minSdkVersion',
+    0x01010270: 'targetSdkVersion',
+    0x010104ec: 'usesCleartextTraffic',
+    0x01010527: 'networkSecurityConfig',
+}
+
+PROTECTION_LEVELS = {0: 'normal', 1: 'dangerous', 2: 'signature', 3: 'signatureOrSystem'}
+PROTECTION_FLAGS = {
+    0x10: 'privileged',
+    0x20: 'development',
+    0x40: 'appop',
+    0x80: 'pre23',
+    0x100: 'installer',
+    0x200: 'verifier',
+    0x400: 'preinstalled',
+}
+
+
+def _read_length8(data, offset):
+    length = data[offset]
+    if length & 0x80:
+        return ((length & 0x7F) << 8) | data[offset + 1], offset + 2
+    return length, offset + 1
+
+
+def _read_length16(data, offset):
+    length = struct.unpack_from('<H', data, offset)[0]
+    if length & 0x8000:
+        low = struct.unpack_from('<H', data, offset + 2)[0]
+        return ((length & 0x7FFF) << 16) | low, offset + 4
+    return length, offset + 2
+
+
+def parse_string_pool(data, offset):
+    """Parse the ResStringPool chunk at offset and return its strings as a list.
+
+    Raises ValueError when the pool is truncated or its offsets point outside data.
+    """
+    try:
+        return _parse_string_pool(data, offset)
+    except (struct.error, IndexError) as e:
+        raise ValueError(f'Corrupt string pool at {offset:#x}: {e}')
+
+
+def _parse_string_pool(data, offset):
+    (chunk_type, _, _, string_count, _, flags,
+     strings_start, _) = struct.unpack_from('<HHIIIIII', data, offset)
+    if chunk_type != RES_STRING_POOL_TYPE:
+        raise ValueError(f'Expected string pool at {offset:#x}, found chunk type {chunk_type:#x}')
+
+    utf8 = bool(flags & UTF8_FLAG)
+    offsets = struct.unpack_from(f'<{string_count}I', data, offset + 28)
+    base = offset + strings_start
+    strings = []
+
+    for string_offset in offsets:
+        position = base + string_offset
+        if utf8:
+            _, position = _read_length8(data, position)
+            byte_length, position = _read_length8(data, position)
+            strings.append(data[position:position + byte_length].decode('utf-8', errors='replace'))
+        else:
+            char_length, position = _read_length16(data, position)
+            strings.append(data[position:position + char_length * 2].decode('utf-16-le', errors='replace'))
+
+    return strings
+
+
+def _escape(value):
+    return (value.replace('&', '&amp;').replace('<', '&lt;')
+            .replace('>', '&gt;').replace('"', '&quot;'))
+
+
+def _format_protection_level(value):
+    names = [PROTECTION_LEVELS.get(value & 0xF, f'{value & 0xF:#x}')]
+    names.extend(name for flag, name in PROTECTION_FLAGS.items() if value & flag)
+    return '|'.join(names)
+
+
+def format_value(strings, name, raw_value, data_type, data):
+    """Render an attribute's typed value the way apktool would where it matters"""
+    if raw_value != NO_INDEX and raw_value < len(strings):
+        return strings[raw_value]
+    if data_type == TYPE_STRING:
+        return strings[data] if data < len(strings) else ''
+    if data_type == TYPE_INT_BOOLEAN:
+        return 'true' if data else 'false'
+    if name == 'protectionLevel' and data_type in (TYPE_INT_DEC, TYPE_INT_HEX):
+        return _format_protection_level(data)
+    if data_type == TYPE_INT_DEC:
+        return str(struct.unpack('<i', struct.pack('<I', data))[0])
+    if data_type == TYPE_INT_HEX:
+        return f'{data:#x}'
+    if data_type == TYPE_FLOAT:
+        return repr(struct.unpack('<f', struct.pack('<I', data))[0])
+    if data_type == TYPE_REFERENCE:
+        return f'@{data:08x}'
+    if data_type == TYPE_ATTRIBUTE:
+        return f'?{data:08x}'
+    return f'{data:#x}'
+
+
+def decode_xml(data):
+    """Decode a binary XML document and return it as XML text.
+
+    Raises ValueError for anything that is not a well-formed binary XML document.
+    """
+    try:
+        return _decode_xml(data)
+    except (struct.error, IndexError) as e:
+        raise ValueError(f'Corrupt binary XML: {e}')
+
+
+def _decode_xml(data):
+    chunk_type, header_size, _ = struct.unpack_from('<HHI', data, 0)
+    if chunk_type != RES_XML_TYPE:
+        raise ValueError('Not a binary XML document')
+
+    strings = []
+    resource_ids = []
+    prefixes = {}
+    pending_namespaces = []
+    lines = ['<?xml version="1.0" encoding="utf-8" standalone="no"?>']
+    depth = 0
+    offset = header_size
+
+    def string_at(index):
+        return strings[index] if index != NO_INDEX and index < len(strings) else ''
+
+    while offset + 8 <= len(data):
+        chunk_type, header_size, chunk_size = struct.unpack_from('<HHI', data, offset)
+        if chunk_size < 8:
+            raise ValueError(f'Corrupt chunk at {offset:#x}')
+        body = offset + header_size
+
+        if chunk_type == RES_STRING_POOL_TYPE:
+            strings = parse_string_pool(data, offset)
+        elif chunk_type == RES_XML_RESOURCE_MAP_TYPE:
+            resource_ids = struct.unpack_from(f'<{(chunk_size - header_size) // 4}I', data, body)
+        elif chunk_type == RES_XML_START_NAMESPACE_TYPE:
+            prefix, uri = struct.unpack_from('<II', data, body)
+            prefixes[string_at(uri)] = string_at(prefix)
+            pending_namespaces.append((string_at(prefix), string_at(uri)))
+        elif chunk_type == RES_XML_START_ELEMENT_TYPE:
+            (_, name, attribute_start, attribute_size,
+             attribute_count) = struct.unpack_from('<IIHHH', data, body)
+            attributes = []
+            for prefix, uri in pending_namespaces:
+                attributes.append((f'xmlns:{prefix}', uri))
+            pending_namespaces = []
+
+            for index in range(attribute_count):
+                attribute_offset = body + attribute_start + index * attribute_size
+                (ns, attribute_name, raw_value, _, _, data_type,
+                 value) = struct.unpack_from('<IIIHBBI', data, attribute_offset)
+                local_name = string_at(attribute_name)
+                if attribute_name < len(resource_ids) and resource_ids[attribute_name] in ANDROID_ATTRIBUTES:
+                    local_name = local_name or ANDROID_ATTRIBUTES[resource_ids[attribute_name]]
+                namespace = string_at(ns)
+                if namespace:
+                    prefix = prefixes.get(namespace, 'android' if namespace == ANDROID_NS else 'ns')
+                    qualified_name = f'{prefix}:{local_name}'
+                else:
+                    qualified_name = local_name
+                attributes.append((qualified_name, format_value(strings, local_name, raw_value, data_type, value)))
+
+            attributes.sort(key=lambda item: (not item[0].startswith('xmlns:'), item[0]))
+            rendered = ''.join(f' {key}="{_escape(value)}"' for key, value in attributes)
+            lines.append(f'{"    " * depth}<{string_at(name)}{rendered}>')
+            depth += 1
+        elif chunk_type == RES_XML_END_ELEMENT_TYPE:
+            _, name = struct.unpack_from('<II', data, body)
+            depth = max(depth - 1, 0)
+            lines.append(f'{"    " * depth}</{string_at(name)}>')
+        elif chunk_type == RES_XML_CDATA_TYPE:
+            text = string_at(struct.unpack_from('<I', data, body)[0]).strip()
+            if text:
+                lines.append(f'{"    " * depth}{_escape(text)}')
+
+        offset += chunk_size
+
+    return '\n'.join(lines) + '\n'
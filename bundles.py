@@ -0,0 +1,188 @@
+"""
+Split APK and bundle (.xapk / .apks) ingestion.
+
+Apps installed from app bundles arrive as a base APK plus config splits (ABI,
+density, language) and sometimes dynamic feature splits, either loose in a
+folder or packed into an .xapk/.apks zip. find_apps() groups them into one
+App per package and version so every app is decompiled and reported once;
+merge_split_tree() folds each decompiled split into the base's tree.
+"""
+
+import os
+import re
+import shutil
+import zipfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional
+
+import axml
+from triage import DEX_PATTERN
+
+BUNDLE_SUFFIXES = ('.xapk', '.apks')
+# bundletool .apks layout: splits/ holds the base and its splits; standalones/
+# and universal.apk repeat the same app for pre-Lollipop devices
+BUNDLE_SPLITS_DIR = 'splits/'
+BUNDLE_STANDALONE_ENTRIES = ('standalones/', 'universal.apk')
+APK_SUFFIXES = ('.apk',) + BUNDLE_SUFFIXES
+# Split copies of apktool output that only make sense for the base; bundletool
+# merges feature-split components into the base manifest at build time anyway
+SPLIT_SKIPPED_ENTRIES = ('AndroidManifest.xml', 'apktool.yml', 'original')
+# Where split files that clash with a different base file are kept
+SPLIT_CONFLICT_DIR = 'splits'
+COPY_CHUNK = 1 << 20
+
+
+@dataclass
+class App:
+    """One logical app: a base APK and the splits installed alongside it"""
+    name: str
+    base: str
+    splits: List[str] = field(default_factory=list)
+    package: Optional[str] = None
+
+    @property
+    def apks(self):
+        return [self.base] + self.splits
+
+
+def _manifest_attribute(manifest_content, attribute):
+    match = re.search(r'<manifest\b[^>]*\s' + attribute + r'="([^"]*)"', manifest_content)
+    return match.group(1) if match else None
+
+
+def split_info(apk_path):
+    """Return (package, versionCode, split name or None for a base APK)"""
+    with zipfile.ZipFile(apk_path) as apk:
+        manifest_content = axml.decode_xml(apk.read('AndroidManifest.xml'))
+    return (_manifest_attribute(manifest_content, 'package'),
+            _manifest_attribute(manifest_content, 'android:versionCode'),
+            _manifest_attribute(manifest_content, 'split'))
+
+
+def has_code(apk_path):
+    """True when the APK carries dex files (config splits never do)"""
+    with zipfile.ZipFile(apk_path) as apk:
+        return any(DEX_PATTERN.match(name) for name in apk.namelist())
+
+
+def extract_bundle(bundle_path, output_dir):
+    """Copy the APKs inside an .xapk/.apks zip to output_dir and return their paths.
+
+    Only .apk entries are extracted (OBB files and icons stay in the bundle).
+    When the bundle has a splits/ directory, the standalone and universal APKs
+    next to it are skipped: they are full copies of the same app.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    apk_paths = []
+    with zipfile.ZipFile(bundle_path) as bundle:
+        infos = bundle.infolist()
+        has_splits = any(info.filename.startswith(BUNDLE_SPLITS_DIR) for info in infos)
+        for info in infos:
+            if info.is_dir() or not info.filename.lower().endswith('.apk'):
+                continue
+            if has_splits and info.filename.startswith(BUNDLE_STANDALONE_ENTRIES):
+                continue
+            # Flatten paths like splits/base-master.apk; the name only has to be unique
+            target = os.path.join(output_dir, info.filename.replace('/', '_').replace('\\', '_'))
+            with bundle.open(info) as source, open(target, 'wb') as f:
+                shutil.copyfileobj(source, f, COPY_CHUNK)
+            apk_paths.append(target)
+    return apk_paths
+
+
+def group_apks(apk_paths, name=None):
+    """Group APKs into Apps by package and versionCode.
+
+    Splits whose base is missing (or unreadable APKs) become Apps of their own
+    so nothing is silently dropped.
+    """
+    groups = {}
+    apps = []
+    for apk_path in apk_paths:
+        try:
+            package, version, split = split_info(apk_path)
+        except (zipfile.BadZipFile, KeyError, ValueError):
+            # Not a zip, no manifest, or a manifest axml cannot decode
+            apps.append(App(name=Path(apk_path).name, base=apk_path))
+            continue
+        group = groups.setdefault((package, version), {'bases': [], 'splits': []})
+        group['splits' if split else 'bases'].append(apk_path)
+
+    for (package, version), group in groups.items():
+        bases, splits = group['bases'], sorted(group['splits'])
+        if len(bases) == 1:
+            apps.append(App(name=name or Path(bases[0]).name, base=bases[0], splits=splits, package=package))
+        else:
+            apps.extend(App(name=Path(apk_path).name, base=apk_path, package=package) for apk_path in bases + splits)
+    return sorted(apps, key=lambda app: app.name)
+
+
+def find_apps(paths, extract_dir):
+    """Turn APK and bundle paths into Apps, extracting bundles under extract_dir.
+
+    Loose APKs are grouped with each other; each bundle is grouped on its own
+    and named after the bundle file.
+    """
+    loose = []
+    apps = []
+    for path in sorted(paths):
+        if path.lower().endswith(BUNDLE_SUFFIXES):
+            try:
+                apk_paths = extract_bundle(path, os.path.join(extract_dir, Path(path).name))
+            except zipfile.BadZipFile:
+                apps.append(App(name=Path(path).name, base=path))
+                continue
+            apps.extend(group_apks(apk_paths, Path(path).name))
+        else:
+            loose.append(path)
+    return sorted(apps + group_apks(loose), key=lambda app: app.name)
+
+
+def split_dir_name(split_path):
+    """A directory-safe name for a split, used for its smali and conflict directories"""
+    return re.sub(r'[^\w.-]', '_', Path(split_path).stem)
+
+
+def merge_split_tree(split_dir, app_dir, split_name):
+    """Move a decompiled split into the base app's tree.
+
+    smali* directories become smali_<split>* so the smali index sees the
+    split's classes, files new to the base are moved to the same relative path,
+    and files that differ from the base copy go under splits/<split>/.
+    """
+    for top in os.listdir(split_dir):
+        if top in SPLIT_SKIPPED_ENTRIES:
+            continue
+        source_top = os.path.join(split_dir, top)
+        if top.startswith('smali') and os.path.isdir(source_top):
+            shutil.move(source_top, os.path.join(app_dir, f'smali_{split_name}{top[len("smali"):]}'))
+        elif os.path.isdir(source_top):
+            for root, dirs, files in os.walk(source_top):
+                for file in files:
+                    _merge_file(os.path.join(root, file), split_dir, app_dir, split_name)
+        else:
+            _merge_file(source_top, split_dir, app_dir, split_name)
+
+
+def _merge_file(source, split_dir, app_dir, split_name):
+    relative_path = os.path.relpath(source, split_dir)
+    target = os.path.join(app_dir, relative_path)
+    if os.path.exists(target):
+        if _same_content(source, target):
+            return
+        target = os.path.join(app_dir, SPLIT_CONFLICT_DIR, split_name, relative_path)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    shutil.move(source, target)
+
+
+def _same_content(first, second):
+    if os.path.getsize(first) != os.path.getsize(second):
+        return False
+    with open(first, 'rb') as a, open(second, 'rb') as b:
+        while True:
+            block = a.read(COPY_CHUNK)
+            if block != b.read(COPY_CHUNK):
+                return False
+            if not block:
+                return True
@@ -0,0 +1,105 @@
+"""
+In-process runners for the seven analysis scripts.
+
+Each check takes a decompiled app directory and returns its findings as plain
+dicts ({'check', 'type', 'value', 'file'}) instead of printing them. Importing
+this module compiles every rule once, so long-running callers such as the
+scanner service pay that cost a single time and can stream results per check.
+"""
+
+import os
+
+import customactions
+import findendpoints
+import findkeys
+import findTests
+import providerRoot
+from exported import find_exported_components
+from permissions import find_permissions
+from smali_index import SmaliIndex
+
+
+def finding(check, kind, value, file=None):
+    return {'check': check, 'type': kind, 'value': value, 'file': file}
+
+
+def _read_manifest(app_dir):
+    with open(os.path.join(app_dir, 'AndroidManifest.xml'), 'r', encoding='utf-8', errors='ignore') as f:
+        return f.read()
+
+
+def check_exported(app_dir, caches=None):
+    results = find_exported_components(_read_manifest(app_dir))
+    return [finding('exported', component, name) for component, names in results.items() for name in names]
+
+
+def check_customactions(app_dir, caches=None):
+    app_name = customactions.extract_app_name(os.path.join(app_dir, 'AndroidManifest.xml'))
+    if not app_name:
+        return []
+    smali_files = customactions.find_smali_files(app_dir)
+    return [finding('customactions', 'action', action)
+            for action in sorted(customactions.find_custom_actions(smali_files, app_name))]
+
+
+def check_findkeys(app_dir, caches=None):
+    cache = (caches or {}).get('findkeys')
+    results = []
+    for file_path in findkeys.find_all_files(app_dir):
+        try:
+            for name, match in findkeys.scan_file(file_path, cache):
+                results.append(finding('findkeys', name, str(match), file_path))
+        except OSError:
+            continue
+    return results
+
+
+def check_findendpoints(app_dir, caches=None):
+    cache = (caches or {}).get('findendpoints')
+    results = []
+    seen = set()
+    for file_path in findendpoints.iter_scan_targets(app_dir):
+        for kind, urls in findendpoints.scan_file(file_path, cache).items():
+            for url in sorted(urls):
+                if (kind, url) not in seen:
+                    seen.add((kind, url))
+                    results.append(finding('findendpoints', kind, url, file_path))
+    return results
+
+
+def check_permissions(app_dir, caches=None):
+    return [finding('permissions', protection_level, name)
+            for name, protection_level in find_permissions(_read_manifest(app_dir))]
+
+
+def check_providerroot(app_dir, caches=None):
+    return [finding('providerRoot', tag, '/', xml_file)
+            for xml_file in providerRoot.find_xml_files(app_dir)
+            for tag, _ in providerRoot.check_for_path_slash(xml_file)]
+
+
+def check_findtests(app_dir, caches=None):
+    package, components = findTests.find_entry_components(_read_manifest(app_dir))
+    return [finding('findTests', entry_point, f'{getter}()', path)
+            for getter, entry_point, path in findTests.iter_intent_reads(components, app_dir, package, SmaliIndex(app_dir))]
+
+
+# Same order as the scripts run by apk_scanner.run_analysis_scripts
+CHECKS = [
+    ('exported', check_exported),
+    ('customactions', check_customactions),
+    ('findkeys', check_findkeys),
+    ('findendpoints', check_findendpoints),
+    ('permissions', check_permissions),
+    ('providerRoot', check_providerroot),
+    ('findTests', check_findtests),
+]
+
+
+def run_checks(app_dir, caches=None):
+    """Yield (check name, findings, error) for each check as it completes"""
+    for name, check in CHECKS:
+        try:
+            yield name, check(app_dir, caches), None
+        except Exception as e:
+            yield name, [], str(e)
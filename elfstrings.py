@@ -0,0 +1,241 @@
+"""
+String extraction from native libraries for the key and endpoint checks.
+
+API keys and hosts are often compiled into lib/<abi>/*.so. Instead of reading
+the libraries as text, this parses the ELF section headers and pulls
+printable runs from .rodata and .data only. Stored (uncompressed) libraries
+are read through a memory map of the APK itself; compressed ones are inflated
+to a temporary file and mapped from there. Copies of the same library for
+different ABIs are merged so each string is checked once, and the findkeys,
+entropy and findendpoints rules run over every unique string on its own.
+Findings carry the library, section and offset of the string.
+"""
+
+import argparse
+import mmap
+import os
+import re
+import shutil
+import struct
+import sys
+import tempfile
+import zipfile
+import zlib
+from contextlib import contextmanager
+from colorama import Fore, Style, init
+from entropy import DEFAULT_THRESHOLD, MIN_LENGTH, WHITESPACE_PATTERN, score_strings
+from findendpoints import extract_urls_from_content
+from findkeys import compiled_patterns, scan_patterns
+
+ELF_MAGIC = b'\x7fELF'
+SHT_NOBITS = 8
+SCANNED_SECTIONS = ('.rodata', '.data')
+MIN_STRING_LENGTH = 6
+STRING_PATTERN = re.compile(rb'[\x20-\x7e]{%d,}' % MIN_STRING_LENGTH)
+LIBRARY_PATTERN = re.compile(r'^lib/([^/]+)/([^/]+\.so)$')
+# The first ABI present supplies the reported location of a shared string
+ABI_ORDER = ('arm64-v8a', 'armeabi-v7a', 'x86_64', 'x86', 'armeabi')
+ZIP_LOCAL_HEADER_SIZE = 30
+# ELF file header sizes for 32- and 64-bit images
+ELF32_HEADER_SIZE = 52
+ELF64_HEADER_SIZE = 64
+# Rules anchored to the whole content (Base64) would match most short strings on their own
+STRING_PATTERNS = {name: pattern for name, pattern in compiled_patterns.items() if not pattern.pattern.startswith('^')}
+
+
+def read_sections(buf, base=0):
+    """Return {section name: (offset, size)} for an ELF image starting at buf[base].
+
+    Raises ValueError when the image is not a well-formed ELF file.
+    """
+    if buf[base:base + 4] != ELF_MAGIC:
+        raise ValueError('not an ELF file')
+    if len(buf) - base < ELF32_HEADER_SIZE:
+        raise ValueError('truncated ELF header')
+    is_64 = buf[base + 4] == 2
+    if is_64 and len(buf) - base < ELF64_HEADER_SIZE:
+        raise ValueError('truncated ELF header')
+    endian = '<' if buf[base + 5] == 1 else '>'
+
+    try:
+        if is_64:
+            shoff, = struct.unpack_from(endian + 'Q', buf, base + 0x28)
+            shentsize, shnum, shstrndx = struct.unpack_from(endian + 'HHH', buf, base + 0x3A)
+            section_format = endian + 'IIQQQQ'
+        else:
+            shoff, = struct.unpack_from(endian + 'I', buf, base + 0x20)
+            shentsize, shnum, shstrndx = struct.unpack_from(endian + 'HHH', buf, base + 0x2E)
+            section_format = endian + 'IIIIII'
+
+        headers = []
+        for index in range(shnum):
+            name, section_type, _, _, offset, size = struct.unpack_from(section_format, buf, base + shoff + index * shentsize)
+            headers.append((name, section_type, offset, size))
+        if shstrndx >= len(headers):
+            raise ValueError('missing section name table')
+    except struct.error as e:
+        raise ValueError(f'truncated ELF file: {e}')
+
+    names_offset = base + headers[shstrndx][2]
+    sections = {}
+    for name, section_type, offset, size in headers:
+        if section_type == SHT_NOBITS:
+            continue
+        end = buf.find(b'\0', names_offset + name)
+        sections[bytes(buf[names_offset + name:end]).decode('ascii', errors='replace')] = (offset, size)
+    return sections
+
+
+def iter_strings(buf, base=0):
+    """Yield (section, offset within section, string) for printable runs in the scanned sections"""
+    for section, (offset, size) in read_sections(buf, base).items():
+        if section not in SCANNED_SECTIONS:
+            continue
+        start = base + offset
+        end = min(start + size, len(buf))
+        for match in STRING_PATTERN.finditer(buf, start, end):
+            yield section, match.start() - start, match.group().decode('ascii')
+
+
+@contextmanager
+def map_entry(apk, apk_map, info):
+    """Yield (buffer, base) holding the bytes of a zip entry without reading it into memory.
+
+    Raises ValueError when a stored entry's local header lies outside the APK.
+    """
+    if info.compress_type == zipfile.ZIP_STORED:
+        try:
+            name_length, extra_length = struct.unpack_from('<HH', apk_map, info.header_offset + 26)
+        except struct.error as e:
+            raise ValueError(f'local header out of range: {e}')
+        yield apk_map, info.header_offset + ZIP_LOCAL_HEADER_SIZE + name_length + extra_length
+        return
+
+    with tempfile.TemporaryFile() as f:
+        with apk.open(info) as source:
+            shutil.copyfileobj(source, f, 1 << 20)
+        f.flush()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as entry_map:
+            yield entry_map, 0
+
+
+def _abi_rank(abi):
+    return ABI_ORDER.index(abi) if abi in ABI_ORDER else len(ABI_ORDER)
+
+
+def collect_library_strings(apk_path, libraries=None, errors=None):
+    """Add the strings of every lib/<abi>/*.so in the APK to libraries and return it.
+
+    libraries maps library name -> {string: (location, section, offset)}; pass
+    the same dict for the base and split APKs of one app. Strings shared by
+    several ABI copies keep the location in the preferred ABI. Libraries that
+    cannot be parsed are skipped and (location, error) is appended to errors
+    when it is given.
+    """
+    libraries = {} if libraries is None else libraries
+    if os.path.getsize(apk_path) == 0:
+        return libraries
+
+    with zipfile.ZipFile(apk_path) as apk, open(apk_path, 'rb') as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as apk_map:
+        entries = []
+        for info in apk.infolist():
+            match = LIBRARY_PATTERN.match(info.filename)
+            if match and info.file_size:
+                entries.append((_abi_rank(match.group(1)), match.group(2), info))
+
+        for _, library, info in sorted(entries, key=lambda entry: (entry[0], entry[2].filename)):
+            strings = libraries.setdefault(library, {})
+            try:
+                with map_entry(apk, apk_map, info) as (buf, base):
+                    for section, offset, value in iter_strings(buf, base):
+                        strings.setdefault(value, (f'{apk_path}!/{info.filename}', section, offset))
+            except (ValueError, zipfile.BadZipFile, NotImplementedError, RuntimeError, zlib.error, EOFError) as e:
+                # Not ELF, truncated or unreadable; the other copies still count
+                if errors is not None:
+                    errors.append((f'{apk_path}!/{info.filename}', e))
+    return libraries
+
+
+def scan_strings(strings, entropy_threshold=DEFAULT_THRESHOLD, names=None):
+    """Run the key, entropy and endpoint rules over strings.
+
+    Each string is scanned on its own, so rules that pair a name with a nearby
+    value cannot match across unrelated strings. When names is given, the key
+    rules see each string as name="string" so the name-keyed rules (api_key,
+    secret, ...) can match. Returns (check, kind, value, index of the first
+    string holding the value) tuples, where check is 'key' or 'endpoint'.
+    """
+    keys = {}
+    endpoints = {}
+    for index, string in enumerate(strings):
+        text = string if names is None else f'{names[index]}="{string}"'
+        for name, match in scan_patterns(text, STRING_PATTERNS):
+            value = match if isinstance(match, str) else next((group for group in match if group), '')
+            if value:
+                keys.setdefault((name, value), index)
+        for kind, urls in extract_urls_from_content(string, None).items():
+            for url in urls:
+                endpoints.setdefault((kind, url), index)
+
+    if entropy_threshold is not None:
+        matched = {value for _, value in keys}
+        candidates = {}
+        for index, value in enumerate(strings):
+            if len(value) >= MIN_LENGTH and not WHITESPACE_PATTERN.search(value) and value not in matched:
+                candidates.setdefault(value, index)
+        if candidates:
+            values = list(candidates)
+            for value, score in zip(values, score_strings(values)):
+                if score >= entropy_threshold:
+                    keys[(f"High Entropy String, confidence {score:.2f}", value)] = candidates[value]
+
+    findings = [('key', name, value, index) for (name, value), index in keys.items()]
+    findings.extend(('endpoint', kind, url, index) for (kind, url), index in sorted(endpoints.items()))
+    return findings
+
+
+def main(apk_paths, entropy_threshold=DEFAULT_THRESHOLD):
+    """Scan the APKs' native libraries and return True when every library could be read"""
+    libraries = {}
+    errors = []
+    for apk_path in apk_paths:
+        try:
+            collect_library_strings(apk_path, libraries, errors)
+        except (OSError, ValueError, zipfile.BadZipFile) as e:
+            errors.append((apk_path, e))
+
+    endpoints = []
+    for library, located in sorted(libraries.items()):
+        strings = list(located)
+        for check, kind, value, index in scan_strings(strings, entropy_threshold):
+            location, section, offset = located[strings[index]]
+            where = f"{location} {section}+0x{offset:x}"
+            if check == 'key':
+                print(Fore.CYAN + Style.BRIGHT + f"KEY FOUND ({kind} in {where}): {value}" + Style.RESET_ALL)
+            else:
+                endpoints.append((kind, value, where))
+
+    if endpoints:
+        print(Fore.CYAN + Style.BRIGHT + "\n=== URLS AND API ENDPOINTS FOUND IN NATIVE LIBRARIES ===" + Style.RESET_ALL)
+        for kind, url, where in endpoints:
+            print(f"{Fore.GREEN}{kind}:{Style.RESET_ALL} {Fore.WHITE}{url}{Style.RESET_ALL}")
+            print(f"  {Fore.YELLOW}Found in: {where}{Style.RESET_ALL}")
+
+    for location, e in errors:
+        print(Fore.RED + f"Cannot read {location}: {e}" + Style.RESET_ALL)
+    return not errors
+
+
+if __name__ == "__main__":
+    init(autoreset=True)
+
+    parser = argparse.ArgumentParser(description='Check strings in native libraries for keys and endpoints')
+    parser.add_argument('apks', nargs='+', help='APK files (the base and splits of one app)')
+    parser.add_argument('--entropy-threshold', type=float, default=DEFAULT_THRESHOLD, metavar='SCORE',
+                        help=f'Minimum confidence (0-1) for high-entropy string findings (default: {DEFAULT_THRESHOLD})')
+    parser.add_argument('--no-entropy', action='store_true', help='Disable the high-entropy string detector')
+    args = parser.parse_args()
+
+    # Exit status 1 tells apk_scanner.py to scan lib/ from the decompiled tree as well
+    sys.exit(0 if main(args.apks, None if args.no_entropy else args.entropy_threshold) else 1)
@@ -0,0 +1,156 @@
+"""
+High-entropy string detector used by findkeys.
+
+Candidate literals are pulled from smali const-string instructions and resource
+<string> values, packed into a fixed-width uint8 matrix and scored in a single
+NumPy pass: per-row Shannon entropy from a byte histogram and how often
+adjacent characters switch class, both measured against what a random string
+over the same alphabet (hex, base36, base62, base64) would reach. Random-looking
+secrets score high whatever their alphabet; identifiers, class names and prose
+score low.
+"""
+
+import re
+import numpy as np
+
+CONST_STRING_PATTERN = re.compile(r'const-string(?:/jumbo)?\s+[vp]\d+,\s+"((?:[^"\\\n]|\\.)*)"')
+RESOURCE_STRING_PATTERN = re.compile(r'<string\b[^>]*>([^<]*)</string>')
+WHITESPACE_PATTERN = re.compile(r'\s')
+
+MIN_LENGTH = 16
+# Width of the scoring matrix; longer literals are scored on their first WIDTH bytes
+WIDTH = 128
+DEFAULT_THRESHOLD = 0.7
+
+# Character class codes used for the class statistics
+_CLASS_OTHER, _CLASS_UPPER, _CLASS_LOWER, _CLASS_DIGIT = 0, 1, 2, 3
+_CLASS_TABLE = np.zeros(256, dtype=np.int8)
+_CLASS_TABLE[ord('A'):ord('Z') + 1] = _CLASS_UPPER
+_CLASS_TABLE[ord('a'):ord('z') + 1] = _CLASS_LOWER
+_CLASS_TABLE[ord('0'):ord('9') + 1] = _CLASS_DIGIT
+
+# Alphabets a secret is usually drawn from, narrowest first:
+# (name, characters, class sizes as (upper, lower, digit, other))
+ALPHABETS = (
+    ('hex', '0123456789abcdef', (0, 6, 10, 0)),
+    ('HEX', '0123456789ABCDEF', (6, 0, 10, 0)),
+    ('base36', '0123456789abcdefghijklmnopqrstuvwxyz', (0, 26, 10, 0)),
+    ('BASE36', '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ', (26, 0, 10, 0)),
+    ('base62', '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz', (26, 26, 10, 0)),
+    ('base64', '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz+/=-_', (26, 26, 10, 2)),
+    ('printable', ''.join(chr(code) for code in range(0x21, 0x7F)), (26, 26, 10, 32)),
+)
+# Byte -> bitmask of the alphabets containing it
+_ALPHABET_MASKS = np.zeros(256, dtype=np.int64)
+for _index, (_, _characters, _) in enumerate(ALPHABETS):
+    for _character in _characters:
+        _ALPHABET_MASKS[ord(_character)] |= 1 << _index
+_ALPHABET_SIZES = np.array([len(characters) for _, characters, _ in ALPHABETS])
+# Chance that two adjacent uniformly random characters fall in different classes
+_ALPHABET_SWITCH_RATES = np.array([
+    1.0 - sum((size / sum(sizes)) ** 2 for size in sizes) for _, _, sizes in ALPHABETS
+])
+# Fraction of the alphabet's random switch rate that still counts as identifier-like
+SWITCH_FLOOR = 0.3
+_EXPECTED_ENTROPY = {}
+_SIMULATION_SAMPLES = 256
+
+
+def _expected_entropy(alphabet):
+    """Mean Shannon entropy of uniformly random strings of each length 0..WIDTH over an alphabet.
+
+    Short strings cannot reach log2(alphabet size), so measured entropy is
+    compared to what a random string of the same length actually scores.
+    Simulated once per alphabet with a fixed seed.
+    """
+    if alphabet not in _EXPECTED_ENTROPY:
+        size = int(_ALPHABET_SIZES[alphabet])
+        samples = np.random.default_rng(alphabet).integers(0, size, (_SIMULATION_SAMPLES, WIDTH))
+        counts = np.zeros((_SIMULATION_SAMPLES, size))
+        expected = np.ones(WIDTH + 1)
+        rows = np.arange(_SIMULATION_SAMPLES)
+        for length in range(1, WIDTH + 1):
+            counts[rows, samples[:, length - 1]] += 1
+            probabilities = counts / length
+            with np.errstate(divide='ignore', invalid='ignore'):
+                entropy = -np.where(counts > 0, probabilities * np.log2(probabilities), 0.0).sum(axis=1)
+            expected[length] = max(entropy.mean(), 1e-9)
+        _EXPECTED_ENTROPY[alphabet] = expected
+    return _EXPECTED_ENTROPY[alphabet]
+
+
+def extract_candidates(content):
+    """Return the distinct const-string and <string> literals that could be secrets"""
+    candidates = {}
+    for pattern in (CONST_STRING_PATTERN, RESOURCE_STRING_PATTERN):
+        for value in pattern.findall(content):
+            if len(value) >= MIN_LENGTH and not WHITESPACE_PATTERN.search(value):
+                candidates[value] = None
+    return list(candidates)
+
+
+def _pack(strings):
+    """Pack strings into an (n, WIDTH) uint8 matrix, zero padded"""
+    buffer = b''.join(s.encode('ascii', errors='ignore')[:WIDTH].ljust(WIDTH, b'\0') for s in strings)
+    return np.frombuffer(buffer, dtype=np.uint8).reshape(len(strings), WIDTH)
+
+
+def score_strings(strings):
+    """Return a confidence score in [0, 1] for each string, computed in one batched pass.
+
+    Each string is matched to the narrowest alphabet that contains it (hex,
+    base36, base62, base64 or printable). Its entropy is compared to what a
+    random string of that length and alphabet reaches, and its class-switch
+    rate (letter/digit/other changes between neighbours) to that alphabet's
+    expected rate. A random hex key and a random base64 key both score near 1;
+    identifiers and paths repeat characters and switch class only at word
+    boundaries.
+    """
+    if not strings:
+        return np.zeros(0)
+
+    rows = _pack(strings)
+    count = rows.shape[0]
+    valid = rows != 0
+    lengths = np.maximum(valid.sum(axis=1), 1)
+
+    # Byte histogram per row: offset each row into its own 256-bin block
+    codes = rows.astype(np.int64) + (np.arange(count, dtype=np.int64) * 256)[:, None]
+    histogram = np.bincount(codes[valid], minlength=count * 256).reshape(count, 256)
+    probabilities = histogram / lengths[:, None]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        entropy = -np.where(histogram > 0, probabilities * np.log2(probabilities), 0.0).sum(axis=1)
+
+    # Narrowest alphabet containing every character of the row
+    masks = np.where(valid, _ALPHABET_MASKS[rows], -1)
+    common = np.bitwise_and.reduce(masks, axis=1)
+    alphabet = np.full(count, len(ALPHABETS) - 1)
+    for index in range(len(ALPHABETS) - 1, -1, -1):
+        alphabet = np.where(common & (1 << index), index, alphabet)
+
+    expected_entropy = np.empty(count)
+    for index in np.unique(alphabet):
+        selected = alphabet == index
+        expected_entropy[selected] = _expected_entropy(int(index))[np.minimum(lengths[selected], WIDTH)]
+    entropy_score = np.clip(entropy / expected_entropy, 0.0, 1.0)
+
+    classes = _CLASS_TABLE[rows]
+    pair_valid = valid[:, 1:] & valid[:, :-1]
+    switches = ((classes[:, 1:] != classes[:, :-1]) & pair_valid).sum(axis=1)
+    switch_rate = switches / np.maximum(pair_valid.sum(axis=1), 1)
+    # Word boundaries in camelCase and snake_case identifiers switch at well under
+    # half the random rate; SWITCH_FLOOR of it and below scores zero
+    switch_ratio = switch_rate / _ALPHABET_SWITCH_RATES[alphabet]
+    switch_score = np.clip((switch_ratio - SWITCH_FLOOR) / (1.0 - SWITCH_FLOOR), 0.0, 1.0)
+
+    return 0.5 * entropy_score + 0.5 * switch_score
+
+
+def find_high_entropy_strings(content, threshold=DEFAULT_THRESHOLD):
+    """Return (string, confidence) pairs for candidate literals scoring at least threshold"""
+    candidates = extract_candidates(content)
+    if not candidates:
+        return []
+
+    scores = score_strings(candidates)
+    return [(value, float(score)) for value, score in zip(candidates, scores) if score >= threshold]
@@ -1,80 +1,105 @@
 import re
 import sys
-import os
-import xml.etree.ElementTree as ET
 from colorama import Fore, Style, init
+from smali_index import SmaliIndex
 
-def find_extra(exported_activities, base_path):
-        
-    for activity in exported_activities:
-        name_match = re.search(r'android:name="([^"]*)"', activity)
+# Component callbacks that receive attacker-controlled Intents
+ENTRY_POINTS = ('onCreate', 'onNewIntent', 'onStartCommand', 'onReceive')
+
+# Intent accessors that read untrusted input, looked up by invoked method name
+INTENT_GETTERS = frozenset([
+    "getIntent",
+    "getAction",
+    "getData",
+    "getCategories",
+    "getFlags",
+    "getComponent",
+    "getStringExtra",
+    "getBooleanExtra",
+    "getIntExtra",
+    "getLongExtra",
+    "getFloatExtra",
+    "getDoubleExtra",
+    "getByteExtra",
+    "getShortExtra",
+    "getCharExtra",
+    "getStringArrayExtra",
+    "getBooleanArrayExtra",
+    "getIntArrayExtra",
+    "getLongArrayExtra",
+    "getFloatArrayExtra",
+    "getDoubleArrayExtra",
+    "getByteArrayExtra",
+    "getShortArrayExtra",
+    "getCharArrayExtra",
+    "getStringArrayListExtra",
+    "getIntegerArrayListExtra",
+    "getCharSequenceArrayListExtra",
+    "getParcelableExtra",
+    "getParcelableArrayExtra",
+    "getParcelableArrayListExtra",
+    "getSerializableExtra",
+    "getBundleExtra",
+    "getDataString",
+    "getType",
+    "getClipData",
+    "getSourceBounds",
+    "getSelector",
+    "getExtras",
+])
+
+# Owners the getters must be invoked on; getIntent() is inherited, so any owner counts
+INTENT_OWNERS = frozenset(['Landroid/content/Intent;', 'Landroid/content/ComponentName;'])
+
+EXPORTED_COMPONENT_PATTERN = re.compile(r'<(?:activity|service|receiver)\b[^>]*(?:android:exported="true"|android:exported="1")[^>]*>')
+PACKAGE_PATTERN = re.compile(r'<manifest\b[^>]*\bpackage="([^"]*)"')
+
+def find_entry_components(manifest_content):
+    """Return the manifest package and the opening tags of exported activities, services and receivers."""
+    package_match = PACKAGE_PATTERN.search(manifest_content)
+    package = package_match.group(1) if package_match else ''
+    return package, EXPORTED_COMPONENT_PATTERN.findall(manifest_content)
+
+def resolve_class_name(name, package):
+    """Expand manifest shorthand ('.Main', 'Main') to a fully qualified class name."""
+    if name.startswith('.'):
+        return package + name
+    if '.' not in name and package:
+        return f'{package}.{name}'
+    return name
+
+def find_intent_reads(smali_class):
+    """Return (getter, entry point) pairs for Intent reads in the class's entry points."""
+    reads = []
+    seen = set()
+    for method in smali_class.methods_named(ENTRY_POINTS):
+        for owner, name, _ in method.invokes:
+            if name in INTENT_GETTERS and (owner in INTENT_OWNERS or name == 'getIntent'):
+                if (name, method.name) not in seen:
+                    seen.add((name, method.name))
+                    reads.append((name, method.name))
+    return reads
+
+def iter_intent_reads(exported_components, base_path, package='', index=None):
+    """Yield (getter, entry point, smali path) for every exported component's Intent reads."""
+    index = index or SmaliIndex(base_path)
+
+    for component in exported_components:
+        name_match = re.search(r'android:name="([^"]*)"', component)
         if not name_match:
             continue
             
-        class_name = name_match.group(1)
-        relative_path = class_name.replace('.', '/') + '.smali'
-        
-        # Search for the file in the base directory
-        found_files = []
-        for root, _, files in os.walk(base_path):
-            for file in files:
-                if file.endswith(".smali") and os.path.join(root, file).endswith(relative_path):
-                    found_files.append(os.path.join(root, file))
-        
-        # Process found files
-        for smali_file_path in found_files:
-            with open(smali_file_path, 'r', encoding='utf-8') as smali_file:
-                smali_content = smali_file.read()
-                onCreate_match = re.search(r'\.method\s+.*?\bonCreate\b.*?\(.*?\).*?\n((?:.|\n)*?)\.end\s+method', smali_content, re.DOTALL)
-                
-                if not onCreate_match:
-                    continue
-                
-                onCreate_content = onCreate_match.group(1)
-                checks = [ 
-                    "getIntent()",
-                    "getAction()",
-                    "getData()",
-                    "getCategories()",
-                    "getFlags()",
-                    "getComponent()",
-                    "getComponent().getClassName()",
-                    "getStringExtra()",
-                    "getBooleanExtra()",
-                    "getIntExtra()",
-                    "getLongExtra()",
-                    "getFloatExtra()",
-                    "getDoubleExtra()",
-                    "getByteExtra()",
-                    "getShortExtra()",
-                    "getCharExtra()",
-                    "getStringArrayExtra()",
-                    "getBooleanArrayExtra()",
-                    "getIntArrayExtra()",
-                    "getLongArrayExtra()",
-                    "getFloatArrayExtra()",
-                    "getDoubleArrayExtra()",
-                    "getByteArrayExtra()",
-                    "getShortArrayExtra()",
-                    "getCharArrayExtra()",
-                    "getStringArrayListExtra()",
-                    "getIntegerArrayListExtra()",
-                    "getCharSequenceArrayListExtra()",
-                    "getParcelableExtra()",
-                    "getParcelableArrayExtra()",
-                    "getParcelableArrayListExtra()",
-                    "getSerializableExtra()",
-                    "getBundleExtra()",
-                    "getDataString()",
-                    "getType()",
-                    "getClipData()",
-                    "getSourceBounds()",
-                    "getSelector()"
-                ]
-
-                for check in checks:
-                    if check in smali_content:
-                        print(f"{Fore.RED}{check}: {smali_file_path}{Style.RESET_ALL}")
+        class_name = resolve_class_name(name_match.group(1), package)
+        smali_class = index.find_class(class_name)
+        if smali_class is None:
+            continue
+
+        for getter, entry_point in find_intent_reads(smali_class):
+            yield getter, entry_point, smali_class.path
+
+def find_extra(exported_components, base_path, package='', index=None):
+    for getter, entry_point, smali_file_path in iter_intent_reads(exported_components, base_path, package, index):
+        print(f"{Fore.RED}{getter}() in {entry_point}: {smali_file_path}{Style.RESET_ALL}")
 
 
 if __name__ == "__main__":
@@ -97,6 +122,5 @@ if __name__ == "__main__":
         print(f"{Fore.RED}Error reading manifest file: {str(e)}{Style.RESET_ALL}")
         sys.exit(1)
 
-    pattern = re.compile(r'<activity[^>]*(?:android:exported="true"|android:exported="1")[^>]*>')
-    exported_activities = pattern.findall(manifest_content)
-    find_extra(exported_activities, path)
\ No newline at end of file
+    package, exported_components = find_entry_components(manifest_content)
+    find_extra(exported_components, path, package)
\ No newline at end of file
@@ -1,25 +1,44 @@
 import os
 import re
 import sys
+import argparse
+from urllib.parse import urlsplit
 from colorama import Fore, Style, init
+from scancache import FindingsCache, content_hash
+from sharding import prune_excluded, scan_files
 
-# Define patterns to find URLs and API endpoints
-url_patterns = {
-    "HTTP URL": re.compile(r"https?://[^\s<>\"'`\]},\)]+"),
-    "API Endpoint": re.compile(r"/api/[^\s<>\"'`\]},\)]+", re.IGNORECASE),
-    "REST API": re.compile(r"/(v\d+/)?(api|rest)/[^\s<>\"'`\]},\)]+", re.IGNORECASE),
-    "GraphQL Endpoint": re.compile(r"/graphql[^\s<>\"'`\]},\)]*", re.IGNORECASE),
-    "Base URL": re.compile(r"base[_\-]?url\s*[=:]\s*['\"](https?://[^'\"]+)['\"]", re.IGNORECASE),
-    "API Key in URL": re.compile(r"[\?&](api[_\-]?key|apikey|key)=([^&\s]+)", re.IGNORECASE),
-}
-
-def find_all_files(directory):
-    """Recursively find all files in the directory."""
-    all_files = []
-    for root, dirs, files in os.walk(directory):
-        for file in files:
-            all_files.append(os.path.join(root, file))
-    return all_files
+# Characters that end a URL or path candidate
+URL_STOP_CHARS = r"\s<>\"'`\]},\)"
+URL_CHARS = rf"[^{URL_STOP_CHARS}]"
+
+# Single tokenizer for every URL/path candidate. Each file is scanned once and
+# the endpoint kinds are read off the match instead of rescanning per kind.
+token_pattern = re.compile(
+    r"(?i:base[_\-]?url)\s*[=:]\s*['\"](?P<base>https?://[^'\"]+)['\"]"
+    rf"|(?P<url>https?://{URL_CHARS}+)"
+    rf"|(?P<path>/(?i:v\d+/)?(?i:api|rest|graphql){URL_CHARS}*)"
+    rf"|(?P<query>[\?&](?i:api[_\-]?key|apikey|key)=[^&{URL_STOP_CHARS}]+)"
+)
+
+# Sub-kinds checked against each candidate
+path_kinds = (
+    ("API Endpoint", re.compile(r"/api/.", re.IGNORECASE)),
+    ("REST API", re.compile(r"/(?:v\d+/)?(?:api|rest)/.", re.IGNORECASE)),
+    ("GraphQL Endpoint", re.compile(r"/graphql", re.IGNORECASE)),
+    ("API Key in URL", re.compile(r"[\?&](?:api[_\-]?key|apikey|key)=[^&\s]", re.IGNORECASE)),
+)
+
+# Known false positives (namespace and DTD URLs): hosts whose URLs are dropped, over either scheme
+FALSE_POSITIVE_HOSTS = frozenset({
+    'schemas.android.com',
+    'schemas.xmlsoap.org',
+    'www.w3.org',
+    'java.sun.com',
+})
+# Hosts where only URLs under a path prefix are false positives
+FALSE_POSITIVE_PATHS = {'www.apple.com': '/dtds'}
+# Host and path of a lower-cased http(s) URL, skipping any userinfo and port
+HOST_PATTERN = re.compile(r'https?://(?:[^/?#@]*@)?([^/?#:]*)(?::\d*)?([^?#]*)')
 
 def clean_url(url):
     """Remove common trailing characters and clean up URLs."""
@@ -30,66 +49,92 @@ def clean_url(url):
     url = url.rstrip('.,;:!?)}\]]')
     
     # Remove HTML entities and tags
-    url = url.replace('&#47;', '/').replace('&amp;', '&')
-    url = re.sub(r'<[^>]+>', '', url)
+    if '&' in url:
+        url = url.replace('&#47;', '/').replace('&amp;', '&')
+    if '<' in url:
+        url = re.sub(r'<[^>]+>', '', url)
     
     # Filter out known false positives
-    false_positives = [
-        'http://schemas.android.com',
-        'http://schemas.xmlsoap.org',
-        'http://www.w3.org',
-        'http://www.apple.com/DTDs',
-        'http://java.sun.com',
-        'xmlns:android'
-    ]
-    
-    for fp in false_positives:
-        if fp in url.lower():
+    lower_url = url.lower()
+    if 'xmlns:android' in lower_url:
+        return None
+    match = HOST_PATTERN.match(lower_url)
+    if match:
+        host, path = match.groups()
+        if host in FALSE_POSITIVE_HOSTS:
+            return None
+        if host in FALSE_POSITIVE_PATHS and path.startswith(FALSE_POSITIVE_PATHS[host]):
             return None
     
     return url if len(url) > 3 else None
 
+def classify_token(match):
+    """Return the endpoint kinds and cleaned value for one tokenizer match."""
+    kind = match.lastgroup
+    url = clean_url(match.group(kind))
+    if not url:
+        return [], None
+
+    kinds = []
+    if kind == 'base':
+        kinds.append("Base URL")
+    if kind in ('base', 'url'):
+        kinds.append("HTTP URL")
+    for name, pattern in path_kinds:
+        if pattern.search(url):
+            kinds.append(name)
+    return kinds, url
+
 def extract_urls_from_content(content, file_path):
     """Extract URLs and endpoints from file content."""
     results = {}
     
-    for pattern_name, pattern in url_patterns.items():
-        matches = pattern.findall(content)
-        if matches:
-            for match in matches:
-                # Clean up the match (remove trailing punctuation, parentheses, etc.)
-                clean_match = clean_url(match)
-                if clean_match and clean_match not in results.get(pattern_name, set()):
-                    if pattern_name not in results:
-                        results[pattern_name] = set()
-                    results[pattern_name].add(clean_match)
+    for match in token_pattern.finditer(content):
+        kinds, url = classify_token(match)
+        for pattern_name in kinds:
+            results.setdefault(pattern_name, set()).add(url)
     
     return results
 
-def scan_file(file_path):
+def host_of(url):
+    """Return the host a finding is aggregated under."""
+    if '://' not in url:
+        return '(relative)'
+    try:
+        return urlsplit(url).hostname or '(unknown)'
+    except ValueError:
+        return '(unknown)'
+
+def scan_file(file_path, cache=None):
     """Scan a single file for URLs and endpoints."""
-    results = {}
-    
     try:
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            content = f.read()
-            results = extract_urls_from_content(content, file_path)
+        with open(file_path, 'rb') as f:
+            data = f.read()
     except PermissionError:
         print(Fore.RED + f"Permission denied: {file_path}" + Style.RESET_ALL)
         return {}
-    except UnicodeDecodeError:
-        # Try reading as binary
-        try:
-            with open(file_path, 'rb') as f:
-                content = f.read().decode('utf-8', errors='ignore')
-                results = extract_urls_from_content(content, file_path)
-        except Exception:
-            return {}
-    except Exception as e:
+    except Exception:
         return {}
-    
+
+    if cache is None:
+        return scan_bytes(data, file_path)
+
+    digest = content_hash(data)
+    cached = cache.get(digest)
+    if cached is not None:
+        return {pattern_name: set(urls) for pattern_name, urls in cached.items()}
+
+    results = scan_bytes(data, file_path)
+    cache.put(digest, {pattern_name: sorted(urls) for pattern_name, urls in results.items()})
     return results
 
+def scan_bytes(data, file_path):
+    """Decode raw file bytes and extract URLs and endpoints from them."""
+    try:
+        return extract_urls_from_content(data.decode('utf-8', errors='ignore'), file_path)
+    except Exception:
+        return {}
+
 def is_interesting_file(file_path):
     """Check if a file is likely to contain URLs (skip binary and library files)."""
     # Skip common binary/library files
@@ -110,45 +155,74 @@ def is_interesting_file(file_path):
     
     return True
 
-def main(directory):
-    """Main function to scan directory for URLs and endpoints."""
-    all_results = {}
-    scanned_files = 0
-    
+def iter_scan_targets(directory, exclude=()):
+    """Yield the files to scan without building the whole list first."""
     if os.path.isfile(directory):
         if is_interesting_file(directory):
-            results = scan_file(directory)
-            if results:
-                all_results[directory] = results
-    elif os.path.isdir(directory):
-        all_files = find_all_files(directory)
-        
-        for file_path in all_files:
+            yield directory
+        return
+    for root, dirs, files in os.walk(directory):
+        prune_excluded(directory, root, dirs, exclude)
+        for file in files:
+            file_path = os.path.join(root, file)
             if is_interesting_file(file_path):
-                results = scan_file(file_path)
-                if results:
-                    all_results[file_path] = results
-                scanned_files += 1
-                
-                # Progress indicator every 100 files (disabled)
-                # if scanned_files % 100 == 0:
-                #     print(Fore.YELLOW + f"Scanning... {scanned_files} files processed" + Style.RESET_ALL, end='\r')
-    else:
+                yield file_path
+
+def iter_results(directory, cache=None, jobs=1, exclude=()):
+    """Yield (file_path, results) for every scan target, in walk order."""
+    if jobs <= 1:
+        for file_path in iter_scan_targets(directory, exclude):
+            yield file_path, scan_file(file_path, cache)
+        return
+
+    # scan_file reports unreadable files itself, so there are no errors to handle
+    for file_path, results, _ in scan_files(scan_file, iter_scan_targets(directory, exclude), jobs, cache):
+        yield file_path, results
+
+def main(directory, cache_dir=None, jobs=1, exclude=()):
+    """Main function to scan directory for URLs and endpoints.
+
+    Findings are printed as soon as they are first seen and only the per-host
+    counts are kept, so memory does not grow with the number of files. Each
+    finding is therefore listed with the first file it appears in; the host
+    summary counts every occurrence.
+    """
+    cache = FindingsCache(cache_dir, 'findendpoints') if cache_dir else None
+    
+    if not os.path.exists(directory):
         print(Fore.RED + "Invalid path provided. Please provide a valid file or directory path." + Style.RESET_ALL)
         sys.exit(1)
     
-    # Print results
-    if all_results:
-        print(Fore.CYAN + Style.BRIGHT + "\n=== URLS AND API ENDPOINTS FOUND ===" + Style.RESET_ALL)
-        
-        for file_path, file_results in all_results.items():
-            for pattern_name, urls in file_results.items():
-                for url in urls:
-                    # Truncate long file paths for display
-                    display_path = file_path if len(file_path) < 80 else "..." + file_path[-77:]
-                    print(f"{Fore.GREEN}{pattern_name}:{Style.RESET_ALL} {Fore.WHITE}{url}{Style.RESET_ALL}")
-                    print(f"  {Fore.YELLOW}Found in: {display_path}{Style.RESET_ALL}")
-        
+    seen = set()
+    hosts = {}
+    
+    for file_path, results in iter_results(directory, cache, jobs, exclude):
+        for pattern_name, urls in results.items():
+            for url in sorted(urls):
+                host = host_of(url)
+                unique, occurrences = hosts.get(host, (0, 0))
+                
+                if (pattern_name, url) in seen:
+                    hosts[host] = (unique, occurrences + 1)
+                    continue
+                seen.add((pattern_name, url))
+                hosts[host] = (unique + 1, occurrences + 1)
+                
+                if len(seen) == 1:
+                    print(Fore.CYAN + Style.BRIGHT + "\n=== URLS AND API ENDPOINTS FOUND ===" + Style.RESET_ALL)
+                    print(Fore.YELLOW + "(each finding is shown once, with the first file it was found in)" + Style.RESET_ALL)
+                # Truncate long file paths for display
+                display_path = file_path if len(file_path) < 80 else "..." + file_path[-77:]
+                print(f"{Fore.GREEN}{pattern_name}:{Style.RESET_ALL} {Fore.WHITE}{url}{Style.RESET_ALL}")
+                print(f"  {Fore.YELLOW}Found in: {display_path}{Style.RESET_ALL}")
+    
+    if cache is not None:
+        cache.flush()
+    
+    if hosts:
+        print(Fore.CYAN + Style.BRIGHT + "\n=== ENDPOINTS BY HOST ===" + Style.RESET_ALL)
+        for host, (unique, occurrences) in sorted(hosts.items(), key=lambda item: (-item[1][0], item[0])):
+            print(f"{Fore.GREEN}{host}:{Style.RESET_ALL} {unique} unique findings, {occurrences} occurrences")
         print(Fore.CYAN + Style.BRIGHT + "=====================================" + Style.RESET_ALL)
     else:
         print(Fore.YELLOW + "No URLs or API endpoints found." + Style.RESET_ALL)
@@ -156,10 +230,14 @@ def main(directory):
 if __name__ == "__main__":
     init(autoreset=True)  # Initialize colorama
 
-    if len(sys.argv) < 2:
-        print(Fore.RED + "Usage: python findendpoints.py <path>" + Style.RESET_ALL)
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description='Extract URLs and API endpoints')
+    parser.add_argument('path', help='Decompiled app directory or single file')
+    parser.add_argument('--cache-dir', metavar='DIR', help='Share findings for identical files through this cache directory')
+    parser.add_argument('--jobs', type=int, default=1, metavar='N',
+                        help='Scan the files in N worker processes (default: 1)')
+    parser.add_argument('--exclude', action='append', default=[], metavar='DIR',
+                        help='Skip directories matching this pattern, relative to path (repeatable)')
+    args = parser.parse_args()
 
-    target_path = sys.argv[1]
-    main(target_path)
+    main(args.path, args.cache_dir, args.jobs, tuple(args.exclude))
 
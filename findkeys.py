@@ -1,7 +1,12 @@
 import os
 import re
 import sys
+import argparse
+from functools import partial
 from colorama import Fore, Style, init
+from scancache import FindingsCache, content_hash
+from entropy import DEFAULT_THRESHOLD, extract_candidates, find_high_entropy_strings, score_strings
+from sharding import prune_excluded, scan_files
 
 # Define all the regex patterns with capturing groups for the key parts
 regex_patterns = {
@@ -36,50 +41,185 @@ regex_patterns = {
     "Base64": r"^([A-Za-z0-9+/]{4})*([A-Za-z0-9+/]{3}=|[A-Za-z0-9+/]{2}==)?$"
 }
 
-def find_all_files(directory):
+# Compiled once per process and reused for every file
+compiled_patterns = {name: re.compile(pattern, re.DOTALL) for name, pattern in regex_patterns.items()}
+
+# Files whose entropy candidates are scored together in one batch
+BATCH_FILES = 256
+# Upper bound on the strings per score_strings call, to keep the scoring matrices small
+BATCH_CANDIDATES = 4096
+
+def find_all_files(directory, exclude=()):
     all_files = []
     for root, dirs, files in os.walk(directory):
+        prune_excluded(directory, root, dirs, exclude)
         for file in files:
             all_files.append(os.path.join(root, file))
     return all_files
 
-def findkeys(file_paths):
+def findkeys(file_paths, cache=None, entropy_threshold=DEFAULT_THRESHOLD, jobs=1):
+    scan = partial(scan_batch, entropy_threshold=entropy_threshold)
+    if jobs <= 1:
+        file_paths = list(file_paths)
+        results = (result for start in range(0, len(file_paths), BATCH_FILES)
+                   for result in scan(file_paths[start:start + BATCH_FILES], cache))
+    else:
+        results = scan_files(scan, file_paths, jobs, cache, batched=True)
+
+    for file_path, findings, error in results:
+        if isinstance(error, PermissionError):
+            print(Fore.RED + f"Permission denied: {file_path}" + Style.RESET_ALL)
+        elif error is not None:
+            raise error
+        else:
+            print_findings(file_path, findings)
+
+def scan_patterns(content, patterns=None):
+    """Return (rule name, match) pairs for every distinct vendor rule match in content.
+
+    patterns defaults to every rule in compiled_patterns.
+    """
+    findings = []
+    seen = set()
+    for name, pattern in (compiled_patterns if patterns is None else patterns).items():
+        matches = pattern.findall(content)
+        for match in matches:
+            if match not in seen:
+                seen.add(match)
+                findings.append((name, match))
+    return findings
+
+def add_entropy_findings(findings, scored, entropy_threshold):
+    """Append the (value, confidence) pairs scoring at least entropy_threshold that no vendor rule matched"""
+    seen = {match for _, match in findings}
+    for value, confidence in scored:
+        if confidence >= entropy_threshold and value not in seen:
+            seen.add(value)
+            findings.append((f"High Entropy String, confidence {confidence:.2f}", value))
+    return findings
+
+def scan_content(content, entropy_threshold=DEFAULT_THRESHOLD):
+    """Return (rule name, match) pairs for every distinct key found in content.
+
+    String literals that no vendor rule matched are also scored by the entropy
+    detector unless entropy_threshold is None.
+    """
+    findings = scan_patterns(content)
+    if entropy_threshold is not None:
+        add_entropy_findings(findings, find_high_entropy_strings(content, entropy_threshold), entropy_threshold)
+    return findings
+
+def cache_namespace(entropy_threshold=DEFAULT_THRESHOLD):
+    """Cache namespace for findkeys; findings depend on the entropy setting"""
+    return 'findkeys' if entropy_threshold is None else f'findkeys-entropy{entropy_threshold:g}'
+
+def _from_cache(cached):
+    # JSON turns multi-group matches into lists
+    return [(name, tuple(match) if isinstance(match, list) else match) for name, match in cached]
+
+def scan_file(file_path, cache=None, entropy_threshold=DEFAULT_THRESHOLD):
+    """Return the (rule name, match) findings for one file, using the cache when given"""
+    with open(file_path, 'rb') as f:
+        data = f.read()
+
+    if cache is None:
+        return scan_content(data.decode('utf-8', errors='ignore'), entropy_threshold)
+
+    digest = content_hash(data)
+    cached = cache.get(digest)
+    if cached is None:
+        findings = scan_content(data.decode('utf-8', errors='ignore'), entropy_threshold)
+        cache.put(digest, findings)
+        return findings
+    return _from_cache(cached)
+
+def scan_batch(file_paths, cache=None, entropy_threshold=DEFAULT_THRESHOLD):
+    """Return (file path, findings, error) for each file, like scan_file but batched.
+
+    The entropy candidates of all files that missed the cache are scored
+    together, so the NumPy setup cost is paid once per batch instead of once
+    per file. error is the OSError raised while reading that file, if any.
+    """
+    results = []
+    # (findings, candidates, cache digest) of files still waiting for their entropy scores
+    pending = []
     for file_path in file_paths:
-        findkeys_in_file(file_path)
+        try:
+            with open(file_path, 'rb') as f:
+                data = f.read()
+        except OSError as e:
+            results.append((file_path, None, e))
+            continue
+
+        digest = content_hash(data) if cache is not None else None
+        cached = cache.get(digest) if cache is not None else None
+        if cached is not None:
+            results.append((file_path, _from_cache(cached), None))
+            continue
+
+        content = data.decode('utf-8', errors='ignore')
+        findings = scan_patterns(content)
+        results.append((file_path, findings, None))
+        if entropy_threshold is not None:
+            pending.append((findings, extract_candidates(content), digest))
+        elif cache is not None:
+            cache.put(digest, findings)
+
+    candidates = [value for _, values, _ in pending for value in values]
+    scores = [float(score) for start in range(0, len(candidates), BATCH_CANDIDATES)
+              for score in score_strings(candidates[start:start + BATCH_CANDIDATES])]
+    position = 0
+    for findings, values, digest in pending:
+        add_entropy_findings(findings, zip(values, scores[position:position + len(values)]), entropy_threshold)
+        position += len(values)
+        if cache is not None:
+            cache.put(digest, findings)
+    return results
 
-def findkeys_in_file(file_path):
+def print_findings(file_path, findings):
+    keysfound = set()
+    for name, match in findings:
+        keysfound.add(match)
+        print(Fore.CYAN + Style.BRIGHT + f"KEY FOUND ({name} in {file_path}): {match}" + Style.RESET_ALL)
+    return keysfound
+
+def findkeys_in_file(file_path, cache=None, entropy_threshold=DEFAULT_THRESHOLD):
     keysfound = set()
     try:
-        with open(file_path, 'r', errors='ignore') as f:
-            content = f.read()
-            for name, pattern in regex_patterns.items():
-                matches = re.findall(pattern, content, flags=re.DOTALL)
-                for match in matches:
-                    if match not in keysfound:
-                        keysfound.add(match)
-                        print(Fore.CYAN + Style.BRIGHT + f"KEY FOUND ({name} in {file_path}): {match}" + Style.RESET_ALL)
+        keysfound = print_findings(file_path, scan_file(file_path, cache, entropy_threshold))
     except PermissionError:
         print(Fore.RED + f"Permission denied: {file_path}" + Style.RESET_ALL)
-    except UnicodeDecodeError:
-        print(Fore.RED + f"Cannot decode file: {file_path}" + Style.RESET_ALL)
     return keysfound
 
-def main(path):
+def main(path, cache_dir=None, entropy_threshold=DEFAULT_THRESHOLD, jobs=1, exclude=()):
+    cache = FindingsCache(cache_dir, cache_namespace(entropy_threshold)) if cache_dir else None
+
     if os.path.isfile(path):
-        findkeys_in_file(path)
+        findkeys_in_file(path, cache, entropy_threshold)
     elif os.path.isdir(path):
-        all_files = find_all_files(path)
-        findkeys(all_files)
+        all_files = find_all_files(path, exclude)
+        findkeys(all_files, cache, entropy_threshold, jobs)
     else:
         print(Fore.RED + "Invalid path provided. Please provide a valid file or directory path." + Style.RESET_ALL)
         sys.exit(1)
 
+    if cache is not None:
+        cache.flush()
+
 if __name__ == "__main__":
     init(autoreset=True)
 
-    if len(sys.argv) < 2:
-        print(Fore.RED + "Usage: python findkeys.py <path>" + Style.RESET_ALL)
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description='Find hardcoded keys and secrets')
+    parser.add_argument('path', help='Decompiled app directory or single file')
+    parser.add_argument('--cache-dir', metavar='DIR', help='Share findings for identical files through this cache directory')
+    parser.add_argument('--entropy-threshold', type=float, default=DEFAULT_THRESHOLD, metavar='SCORE',
+                        help=f'Minimum confidence (0-1) for high-entropy string findings (default: {DEFAULT_THRESHOLD})')
+    parser.add_argument('--no-entropy', action='store_true', help='Disable the high-entropy string detector')
+    parser.add_argument('--jobs', type=int, default=1, metavar='N',
+                        help='Scan the files in N worker processes (default: 1)')
+    parser.add_argument('--exclude', action='append', default=[], metavar='DIR',
+                        help='Skip directories matching this pattern, relative to path (repeatable)')
+    args = parser.parse_args()
 
-    target_path = sys.argv[1]
-    main(target_path)
+    main(args.path, args.cache_dir, None if args.no_entropy else args.entropy_threshold, args.jobs,
+         tuple(args.exclude))
@@ -0,0 +1,134 @@
+"""
+Content-addressed findings cache for the file-level checks.
+
+In a folder run the same SDK classes and resource files show up byte-identical
+in many APKs. The file-level checks hash each file they read and look the
+digest up here first, so every unique file content is scanned once per run and
+the cached findings are reported against each file that carries that content.
+
+Entries live in a bounded in-memory LRU map. Evicted entries, and everything
+still in memory when the check finishes, are spilled to a cache directory so
+the next check process (for the next APK) can pick them up.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+DEFAULT_MAX_ENTRIES = 20000
+STATS_FILE = 'stats.jsonl'
+
+
+def content_hash(data):
+    """Return the hex digest used as the cache key for a file's bytes"""
+    return hashlib.sha1(data).hexdigest()
+
+
+class FindingsCache:
+    """Bounded LRU map of content hash -> findings that spills to disk.
+
+    Safe to share between threads (the scanner service runs several jobs at once).
+    """
+
+    def __init__(self, cache_dir, namespace, max_entries=DEFAULT_MAX_ENTRIES):
+        self.cache_dir = cache_dir
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._unsaved = set()
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _disk_path(self, digest):
+        return os.path.join(self.cache_dir, self.namespace, digest[:2], digest + '.json')
+
+    def _load(self, digest):
+        try:
+            with open(self._disk_path(digest), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save(self, digest, findings):
+        path = self._disk_path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(findings, f)
+            os.replace(tmp_path, path)
+        except OSError:
+            # A failed spill only costs a rescan later
+            pass
+
+    def get(self, digest):
+        """Return cached findings for digest, or None if it has not been scanned"""
+        with self._lock:
+            return self._get(digest)
+
+    def _get(self, digest):
+        if digest in self._entries:
+            self._entries.move_to_end(digest)
+            self.hits += 1
+            return self._entries[digest]
+
+        findings = self._load(digest)
+        if findings is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._insert(digest, findings)
+        return findings
+
+    def put(self, digest, findings):
+        """Store the findings for a freshly scanned digest (must be JSON serializable)"""
+        with self._lock:
+            self._insert(digest, findings)
+            self._unsaved.add(digest)
+
+    def _insert(self, digest, findings):
+        self._entries[digest] = findings
+        self._entries.move_to_end(digest)
+        while len(self._entries) > self.max_entries:
+            old_digest, old_findings = self._entries.popitem(last=False)
+            if old_digest in self._unsaved:
+                self._unsaved.discard(old_digest)
+                self._save(old_digest, old_findings)
+
+    def spill(self):
+        """Write entries not yet on disk so other processes can see them"""
+        with self._lock:
+            for digest in list(self._unsaved):
+                self._save(digest, self._entries[digest])
+            self._unsaved.clear()
+
+    def flush(self):
+        """Spill unsaved entries to disk and append this process's hit/miss counts"""
+        self.spill()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(os.path.join(self.cache_dir, STATS_FILE), 'a', encoding='utf-8') as f:
+            f.write(json.dumps({'namespace': self.namespace, 'hits': self.hits, 'misses': self.misses}) + '\n')
+
+
+def read_stats(cache_dir):
+    """Sum the hit/miss counts recorded by every check process in cache_dir"""
+    totals = {}
+    try:
+        with open(os.path.join(cache_dir, STATS_FILE), 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                hits, misses = totals.get(record['namespace'], (0, 0))
+                totals[record['namespace']] = (hits + record['hits'], misses + record['misses'])
+    except OSError:
+        pass
+    return totals
@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+"""
+Long-running scanner service with a local HTTP submission API.
+
+Keeps the Python interpreter, compiled rules and findings caches resident
+between submissions. APKs are queued to a fixed pool of worker threads that
+decompile them and run the in-process checks, publishing each check's
+findings as soon as it completes. apktool runs as a subprocess, so decompiles
+overlap; the checks themselves are Python and take turns on the GIL, so more
+workers do not speed up the analysis part.
+
+Endpoints (JSON unless noted):
+  POST /jobs               body: raw APK bytes, or {"path": "/abs/app.apk"} with
+                           Content-Type: application/json -> 202 {"job_id": ...}
+                           (paths only when the service runs with --allowed-dir,
+                           and only inside that directory)
+  GET  /jobs/<id>          job status and every event so far
+  GET  /jobs/<id>/events   NDJSON stream of events until the job finishes
+  GET  /status             concurrency limits, queue depth and job counts
+"""
+
+import argparse
+import json
+import os
+import queue
+import shutil
+import socketserver
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import findkeys
+from apk_scanner import Colors, decompile_apk, robust_remove_directory
+from checks import run_checks
+from scancache import FindingsCache
+
+DEFAULT_PORT = 8765
+DEFAULT_WORKERS = 2
+DEFAULT_MAX_QUEUE = 32
+DEFAULT_MAX_UPLOAD_MB = 512
+# Finished jobs kept for polling before the oldest are forgotten
+MAX_FINISHED_JOBS = 1000
+UPLOAD_CHUNK = 1 << 20
+
+
+class Job:
+    """One submitted APK and the events published while scanning it"""
+
+    def __init__(self, apk_path, owns_apk):
+        self.id = uuid.uuid4().hex
+        self.apk_path = apk_path
+        self.owns_apk = owns_apk
+        self.status = 'queued'
+        self.error = None
+        self.events = []
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.condition = threading.Condition()
+
+    def publish(self, event):
+        with self.condition:
+            self.events.append(event)
+            self.condition.notify_all()
+
+    def finish(self, status, error=None):
+        with self.condition:
+            self.status = status
+            self.error = error
+            self.finished = time.time()
+            self.events.append({'event': 'finished', 'status': status, 'error': error})
+            self.condition.notify_all()
+
+    def summary(self):
+        with self.condition:
+            return {
+                'job_id': self.id,
+                'status': self.status,
+                'error': self.error,
+                'submitted': self.submitted,
+                'started': self.started,
+                'finished': self.finished,
+                'events': list(self.events),
+            }
+
+
+class ScannerService:
+    """Job queue, worker pool and the caches they share"""
+
+    def __init__(self, work_dir, workers=DEFAULT_WORKERS, max_queue=DEFAULT_MAX_QUEUE):
+        self.work_dir = work_dir
+        self.workers = workers
+        self.max_queue = max_queue
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.jobs = OrderedDict()
+        self.lock = threading.Lock()
+        self.busy = 0
+        self.completed = 0
+        self.failed = 0
+
+        cache_dir = os.path.join(work_dir, 'cache')
+        self.caches = {
+            'findkeys': FindingsCache(cache_dir, findkeys.cache_namespace()),
+            'findendpoints': FindingsCache(cache_dir, 'findendpoints'),
+        }
+
+        for index in range(workers):
+            threading.Thread(target=self._worker, name=f'scan-worker-{index}', daemon=True).start()
+
+    def submit(self, apk_path, owns_apk):
+        """Queue an APK; returns the Job, or None when the queue is full"""
+        job = Job(apk_path, owns_apk)
+        with self.lock:
+            try:
+                self.queue.put_nowait(job)
+            except queue.Full:
+                return None
+            self.jobs[job.id] = job
+            self._forget_finished()
+        return job
+
+    def _forget_finished(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished]
+        for job_id in finished[:max(len(finished) - MAX_FINISHED_JOBS, 0)]:
+            del self.jobs[job_id]
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def status(self):
+        with self.lock:
+            states = {}
+            for job in self.jobs.values():
+                states[job.status] = states.get(job.status, 0) + 1
+            return {
+                'workers': self.workers,
+                'busy_workers': self.busy,
+                'queue_depth': self.queue.qsize(),
+                'max_queue': self.max_queue,
+                'completed': self.completed,
+                'failed': self.failed,
+                'jobs': states,
+                'cache': {name: {'entries': len(cache), 'hits': cache.hits, 'misses': cache.misses}
+                          for name, cache in self.caches.items()},
+            }
+
+    def _worker(self):
+        while True:
+            job = self.queue.get()
+            with self.lock:
+                self.busy += 1
+            try:
+                self._run(job)
+            finally:
+                with self.lock:
+                    self.busy -= 1
+                    if job.status == 'done':
+                        self.completed += 1
+                    else:
+                        self.failed += 1
+                self.queue.task_done()
+
+    def _run(self, job):
+        job.status = 'running'
+        job.started = time.time()
+        app_dir = os.path.join(self.work_dir, f'job_{job.id}')
+
+        try:
+            job.publish({'event': 'decompile', 'status': 'started'})
+            if not decompile_apk(job.apk_path, app_dir, quiet=True) or not os.path.exists(os.path.join(app_dir, 'AndroidManifest.xml')):
+                job.finish('failed', 'Failed to decompile APK')
+                return
+            job.publish({'event': 'decompile', 'status': 'done', 'seconds': round(time.time() - job.started, 3)})
+
+            for name, findings, error in run_checks(app_dir, self.caches):
+                job.publish({'event': 'check', 'check': name, 'findings': findings, 'error': error})
+            job.finish('done')
+        except Exception as e:
+            job.finish('failed', str(e))
+        finally:
+            robust_remove_directory(Path(app_dir))
+            if job.owns_apk:
+                try:
+                    os.remove(job.apk_path)
+                except OSError:
+                    pass
+
+
+def resolve_allowed_path(apk_path, allowed_dir):
+    """Return the real path of apk_path if it is a file inside allowed_dir, else None.
+
+    Symlinks and '..' are resolved first, so neither can point outside the directory.
+    """
+    if not allowed_dir or not isinstance(apk_path, str):
+        return None
+    real_path = os.path.realpath(apk_path)
+    real_dir = os.path.realpath(allowed_dir)
+    try:
+        inside = os.path.commonpath([real_path, real_dir]) == real_dir
+    except ValueError:
+        # Different drives on Windows
+        return None
+    return real_path if inside and os.path.isfile(real_path) else None
+
+
+class ServiceRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    service = None
+    max_upload = DEFAULT_MAX_UPLOAD_MB << 20
+    # Only files under this directory may be submitted by path; None refuses path submissions
+    allowed_dir = None
+
+    def address_string(self):
+        # Unix socket peers have no address tuple
+        return self.client_address[0] if isinstance(self.client_address, tuple) else 'unix'
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        parts = [part for part in self.path.split('?', 1)[0].split('/') if part]
+
+        if parts == ['status']:
+            self._send_json(200, self.service.status())
+        elif len(parts) in (2, 3) and parts[0] == 'jobs':
+            job = self.service.get(parts[1])
+            if job is None:
+                self._send_json(404, {'error': 'unknown job'})
+            elif len(parts) == 2:
+                self._send_json(200, job.summary())
+            elif parts[2] == 'events':
+                self._stream_events(job)
+            else:
+                self._send_json(404, {'error': 'not found'})
+        else:
+            self._send_json(404, {'error': 'not found'})
+
+    def _stream_events(self, job):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        sent = 0
+        while True:
+            with job.condition:
+                while sent == len(job.events) and job.finished is None:
+                    job.condition.wait()
+                events = job.events[sent:]
+                done = job.finished is not None
+            sent += len(events)
+
+            for event in events:
+                line = (json.dumps(event) + '\n').encode('utf-8')
+                self.wfile.write(f'{len(line):x}\r\n'.encode('ascii') + line + b'\r\n')
+            self.wfile.flush()
+            if done and sent == len(job.events):
+                break
+
+        self.wfile.write(b'0\r\n\r\n')
+
+    def do_POST(self):
+        if self.path.split('?', 1)[0].rstrip('/') != '/jobs':
+            self._send_json(404, {'error': 'not found'})
+            return
+
+        length = int(self.headers.get('Content-Length') or 0)
+        if length <= 0:
+            self._send_json(400, {'error': 'empty request body'})
+            return
+        if length > self.max_upload:
+            self._send_json(413, {'error': 'APK exceeds upload limit'})
+            return
+
+        if self.headers.get('Content-Type', '').startswith('application/json'):
+            try:
+                requested_path = json.loads(self.rfile.read(length))['path']
+            except (ValueError, KeyError, TypeError):
+                self._send_json(400, {'error': 'expected {"path": ...}'})
+                return
+            if not self.allowed_dir:
+                self._send_json(403, {'error': 'path submissions are disabled; upload the APK bytes instead'})
+                return
+            apk_path = resolve_allowed_path(requested_path, self.allowed_dir)
+            if apk_path is None:
+                self._send_json(403, {'error': f'not a file under the allowed directory: {requested_path}'})
+                return
+            owns_apk = False
+        else:
+            # Stream the upload to disk instead of holding it in memory
+            fd, apk_path = tempfile.mkstemp(suffix='.apk', dir=self.service.work_dir)
+            with os.fdopen(fd, 'wb') as f:
+                remaining = length
+                while remaining:
+                    chunk = self.rfile.read(min(UPLOAD_CHUNK, remaining))
+                    if not chunk:
+                        break
+                    f.write(chunk)
+                    remaining -= len(chunk)
+            if remaining:
+                # The client went away before sending Content-Length bytes
+                os.remove(apk_path)
+                self._send_json(400, {'error': f'upload truncated: {remaining} of {length} bytes missing'})
+                return
+            owns_apk = True
+
+        job = self.service.submit(apk_path, owns_apk)
+        if job is None:
+            if owns_apk:
+                os.remove(apk_path)
+            self._send_json(503, {'error': 'queue full', 'max_queue': self.service.max_queue})
+            return
+        self._send_json(202, {'job_id': job.id, 'status': job.status})
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the APK scanner as a local service')
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'TCP port (default: {DEFAULT_PORT})')
+    parser.add_argument('--unix', metavar='PATH', help='Listen on a Unix socket instead of TCP')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help=f'Concurrent scans (default: {DEFAULT_WORKERS}). Workers are threads: their apktool runs '
+                             'overlap, but the Python checks share the GIL and effectively run one at a time')
+    parser.add_argument('--max-queue', type=int, default=DEFAULT_MAX_QUEUE,
+                        help=f'Queued jobs before submissions are refused (default: {DEFAULT_MAX_QUEUE})')
+    parser.add_argument('--max-upload-mb', type=int, default=DEFAULT_MAX_UPLOAD_MB,
+                        help=f'Largest accepted APK upload (default: {DEFAULT_MAX_UPLOAD_MB})')
+    parser.add_argument('--work-dir', metavar='DIR', help='Directory for uploads, decompiled apps and caches')
+    parser.add_argument('--allowed-dir', metavar='DIR',
+                        help='Accept {"path": ...} submissions for APKs under this directory '
+                             '(default: uploads only, path submissions are refused)')
+    args = parser.parse_args()
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix='apk_scanner_service_')
+    os.makedirs(work_dir, exist_ok=True)
+
+    ServiceRequestHandler.service = ScannerService(work_dir, args.workers, args.max_queue)
+    ServiceRequestHandler.max_upload = args.max_upload_mb << 20
+    ServiceRequestHandler.allowed_dir = args.allowed_dir
+
+    if args.unix:
+        if os.path.exists(args.unix):
+            os.remove(args.unix)
+        server = UnixHTTPServer(args.unix, ServiceRequestHandler)
+        where = args.unix
+    else:
+        server = ThreadingHTTPServer((args.host, args.port), ServiceRequestHandler)
+        where = f'http://{args.host}:{args.port}'
+
+    print(f"{Colors.GREEN}[+] Scanner service listening on {where} "
+          f"({args.workers} workers, queue {args.max_queue}){Colors.RESET}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        for cache in ServiceRequestHandler.service.caches.values():
+            cache.flush()
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
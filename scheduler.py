@@ -0,0 +1,212 @@
+"""
+Resource-aware admission for the decompile and analysis stages.
+
+apktool JVMs are memory hungry while the analysis scripts are CPU bound and
+light on memory, so the two stages get separate pools. Before a job enters a
+pool its cost is estimated from the APK (size, dex count and dex bytes) and
+the scheduler checks available RAM, load per CPU and free disk against what
+is already reserved. Every admission decision is logged as a JSON line on the
+'apk_scanner.scheduler' logger for tuning.
+"""
+
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import zipfile
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+logger = logging.getLogger('apk_scanner.scheduler')
+
+# JVM heap estimate: a fixed base plus a share per MB of dex, clamped
+BASE_HEAP_MB = 512
+HEAP_MB_PER_DEX_MB = 40
+MIN_HEAP_MB = 512
+MAX_HEAP_MB = 6144
+# Decompiled trees are typically several times the APK size
+DISK_MB_PER_APK_MB = 6
+# Resident memory of one analysis run (seven Python processes, one at a time)
+ANALYSIS_MEMORY_MB = 256
+# Resident memory of one zip scan (assets, native strings or resources.arsc) run next to apktool
+ZIP_SCAN_MEMORY_MB = 128
+# Memory kept free for the OS and everything else
+MEMORY_RESERVE_MB = 1024
+DEFAULT_MAX_LOAD = 1.5
+POLL_INTERVAL = 1.0
+
+
+@dataclass
+class JobEstimate:
+    """Expected cost of decompiling and analyzing one APK"""
+    apk: str
+    apk_mb: float
+    dex_count: int
+    dex_mb: float
+    heap_mb: int
+    disk_mb: int
+
+
+def estimate_cost(apk_path):
+    """Estimate JVM heap and disk needs from the APK's zip directory"""
+    apk_mb = os.path.getsize(apk_path) / (1 << 20)
+    dex_count = 0
+    dex_bytes = 0
+    try:
+        with zipfile.ZipFile(apk_path) as apk:
+            for info in apk.infolist():
+                if info.filename.startswith('classes') and info.filename.endswith('.dex'):
+                    dex_count += 1
+                    dex_bytes += info.file_size
+    except zipfile.BadZipFile:
+        pass
+
+    dex_mb = dex_bytes / (1 << 20)
+    heap_mb = int(min(max(BASE_HEAP_MB + HEAP_MB_PER_DEX_MB * dex_mb, MIN_HEAP_MB), MAX_HEAP_MB))
+    return JobEstimate(
+        apk=os.path.basename(apk_path),
+        apk_mb=round(apk_mb, 1),
+        dex_count=dex_count,
+        dex_mb=round(dex_mb, 1),
+        heap_mb=heap_mb,
+        disk_mb=int(apk_mb * DISK_MB_PER_APK_MB) + 16,
+    )
+
+
+def available_memory_mb():
+    """Available RAM in MB, or None when it cannot be determined"""
+    try:
+        with open('/proc/meminfo', 'r') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import psutil
+        return psutil.virtual_memory().available / (1 << 20)
+    except ImportError:
+        return None
+
+
+def load_per_cpu():
+    """One-minute load average divided by CPU count, or None where unsupported"""
+    try:
+        return os.getloadavg()[0] / (os.cpu_count() or 1)
+    except (AttributeError, OSError):
+        return None
+
+
+def free_disk_mb(path):
+    return shutil.disk_usage(path).free / (1 << 20)
+
+
+class ResourceScheduler:
+    """Admits jobs to separate decompile and analysis pools based on live resources.
+
+    Reservations of running jobs are subtracted from the sampled free memory and
+    disk, which double-counts what those jobs already use; that errs on the side
+    of not OOM-killing the box. A pool with nothing running always admits one
+    job so an oversized APK cannot stall the run.
+    """
+
+    def __init__(self, work_dir, max_decompile=None, max_analysis=None, max_load=DEFAULT_MAX_LOAD):
+        cpus = os.cpu_count() or 1
+        self.work_dir = work_dir
+        self.max_decompile = max_decompile or max(1, cpus // 2)
+        self.max_analysis = max_analysis or cpus
+        self.max_load = max_load
+        self._condition = threading.Condition()
+        self._running = {'decompile': 0, 'analysis': 0}
+        self._reserved_memory_mb = 0
+        self._reserved_disk_mb = 0
+
+    def _log(self, decision, pool, estimate, **details):
+        record = {'time': round(time.time(), 3), 'decision': decision, 'pool': pool}
+        record.update(asdict(estimate))
+        record.update(running=dict(self._running), reserved_memory_mb=self._reserved_memory_mb,
+                      reserved_disk_mb=self._reserved_disk_mb, **details)
+        logger.info(json.dumps(record))
+
+    def _check(self, pool, limit, memory_mb, disk_mb, check_disk):
+        """Return the reason the job must wait, or None if it can start now"""
+        if self._running[pool] >= limit:
+            return f'{pool} pool full ({limit})'
+        if self._running[pool] == 0:
+            return None
+
+        memory = available_memory_mb()
+        if memory is not None and memory - self._reserved_memory_mb - memory_mb < MEMORY_RESERVE_MB:
+            return f'memory: {memory:.0f} MB available, {self._reserved_memory_mb} MB reserved'
+        load = load_per_cpu()
+        if load is not None and load > self.max_load:
+            return f'load: {load:.2f} per CPU'
+        if check_disk and disk_mb:
+            disk = free_disk_mb(self.work_dir)
+            if disk - self._reserved_disk_mb - disk_mb < 0:
+                return f'disk: {disk:.0f} MB free, {self._reserved_disk_mb} MB reserved'
+        return None
+
+    @contextmanager
+    def _slot(self, pool, limit, estimate, memory_mb, disk_mb, check_disk=True):
+        queued_at = time.time()
+        logged_reason = None
+        with self._condition:
+            while True:
+                reason = self._check(pool, limit, memory_mb, disk_mb, check_disk)
+                if reason is None:
+                    break
+                if reason != logged_reason:
+                    self._log('wait', pool, estimate, reason=reason)
+                    logged_reason = reason
+                # Re-sample resources periodically even if nothing is released
+                self._condition.wait(POLL_INTERVAL)
+
+            self._running[pool] += 1
+            self._reserved_memory_mb += memory_mb
+            self._reserved_disk_mb += disk_mb
+            self._log('admit', pool, estimate, waited=round(time.time() - queued_at, 3),
+                      available_memory_mb=available_memory_mb(), load_per_cpu=load_per_cpu())
+
+        started_at = time.time()
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._running[pool] -= 1
+                self._reserved_memory_mb -= memory_mb
+                self._reserved_disk_mb -= disk_mb
+                self._log('release', pool, estimate, seconds=round(time.time() - started_at, 3))
+                self._condition.notify_all()
+
+    def decompile_slot(self, estimate, zip_scans=0):
+        """Context manager holding a decompile slot sized to the job's heap and disk needs.
+
+        zip_scans is the number of zip scan processes started inside the slot;
+        their memory is reserved on top of the JVM heap.
+        """
+        return self._slot('decompile', self.max_decompile, estimate,
+                          estimate.heap_mb + ZIP_SCAN_MEMORY_MB * zip_scans, estimate.disk_mb)
+
+    def analysis_slot(self, estimate, jobs=1):
+        """Context manager holding an analysis slot for a run with jobs worker processes.
+
+        The decompiled tree already exists at this point, so its disk space stays
+        reserved but is not checked again.
+        """
+        return self._slot('analysis', self.max_analysis, estimate, ANALYSIS_MEMORY_MB * jobs, estimate.disk_mb,
+                          check_disk=False)
+
+
+def configure_logging(log_file: Optional[str]):
+    """Write scheduling decisions as JSON lines to log_file"""
+    if not log_file:
+        return
+    handler = logging.FileHandler(log_file, encoding='utf-8')
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
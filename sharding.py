@@ -0,0 +1,132 @@
+"""
+Intra-APK parallelism for the file-level checks.
+
+A large app decompiles to 100k+ smali files, and scanning them one by one is
+the long tail of a batch. scan_files() splits the file list into consecutive
+chunks of roughly equal byte size, scans the chunks in a process pool and
+yields per-file results in the original file order, so output is identical to
+a sequential run whatever the worker count.
+
+Chunks are submitted in order with at most IN_FLIGHT_PER_WORKER per worker
+queued or running, so finished results waiting for an earlier, slower chunk
+are bounded by that window rather than by the size of the app.
+prune_excluded() is the directory filter the file-level checks share for
+their --exclude option.
+"""
+
+import os
+from collections import deque
+from fnmatch import fnmatchcase
+from concurrent.futures import ProcessPoolExecutor
+
+from scancache import FindingsCache
+
+MIN_CHUNK_BYTES = 256 << 10
+MAX_CHUNK_BYTES = 16 << 20
+# Aim for this many chunks per worker so a slow chunk can be balanced out
+CHUNKS_PER_WORKER = 8
+# Chunks submitted ahead per worker; bounds the results held back for ordering
+IN_FLIGHT_PER_WORKER = 2
+
+_worker_cache = None
+
+
+def prune_excluded(directory, root, dirs, exclude):
+    """Drop subdirectories whose path relative to directory matches a pattern in exclude"""
+    if not exclude:
+        return
+    relative_root = os.path.relpath(root, directory).replace('\\', '/')
+    prefix = '' if relative_root == '.' else relative_root + '/'
+    dirs[:] = [d for d in dirs if not any(fnmatchcase(prefix + d, pattern) for pattern in exclude)]
+
+
+def plan_chunks(file_paths, jobs):
+    """Split file_paths into consecutive chunks of roughly equal total size.
+
+    Returns a list of (total bytes, [paths]). A file larger than the chunk
+    target gets a chunk of its own.
+    """
+    sized = []
+    for file_path in file_paths:
+        try:
+            sized.append((file_path, os.path.getsize(file_path)))
+        except OSError:
+            # Let the scan itself report unreadable files
+            sized.append((file_path, 0))
+
+    total = sum(size for _, size in sized)
+    target = min(max(total // (jobs * CHUNKS_PER_WORKER), MIN_CHUNK_BYTES), MAX_CHUNK_BYTES)
+
+    chunks = []
+    current, current_bytes = [], 0
+    for file_path, size in sized:
+        if current and current_bytes + size > target:
+            chunks.append((current_bytes, current))
+            current, current_bytes = [], 0
+        current.append(file_path)
+        current_bytes += size
+    if current:
+        chunks.append((current_bytes, current))
+    return chunks
+
+
+def _init_worker(cache_dir, namespace):
+    global _worker_cache
+    _worker_cache = FindingsCache(cache_dir, namespace) if cache_dir else None
+
+
+def _scan_chunk(scan, file_paths, batched=False):
+    """Scan one chunk in a worker; returns per-file results and the cache counts it added"""
+    cache = _worker_cache
+    hits, misses = (cache.hits, cache.misses) if cache is not None else (0, 0)
+
+    if batched:
+        results = scan(file_paths, cache)
+    else:
+        results = []
+        for file_path in file_paths:
+            try:
+                results.append((file_path, scan(file_path, cache), None))
+            except OSError as e:
+                results.append((file_path, None, e))
+
+    if cache is None:
+        return results, 0, 0
+    # Publish new entries so the other workers (and the next APK) can reuse them
+    cache.spill()
+    return results, cache.hits - hits, cache.misses - misses
+
+
+def scan_files(scan, file_paths, jobs, cache=None, batched=False):
+    """Yield (file path, findings, error) for every file, in file_paths order.
+
+    scan(file_path, cache) must be a picklable module-level callable (or a
+    functools.partial of one). error is the OSError raised for that file, if any.
+    With batched=True, scan(file_paths, cache) is called once per chunk instead
+    and must itself return the (file path, findings, error) list for the chunk.
+    With a cache, each worker opens the same cache directory and namespace, and
+    their hit/miss counts are added to cache so its flush() reports the run.
+    """
+    chunks = plan_chunks(list(file_paths), jobs)
+    if not chunks:
+        return
+
+    cache_dir = cache.cache_dir if cache is not None else None
+    namespace = cache.namespace if cache is not None else None
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(cache_dir, namespace)) as executor:
+        pending = deque()
+        for _, chunk in chunks:
+            pending.append(executor.submit(_scan_chunk, scan, chunk, batched))
+            if len(pending) >= jobs * IN_FLIGHT_PER_WORKER:
+                yield from _collect(pending.popleft(), cache)
+        while pending:
+            yield from _collect(pending.popleft(), cache)
+
+
+def _collect(future, cache):
+    """Return a chunk's per-file results, adding its cache counts to cache"""
+    results, hits, misses = future.result()
+    if cache is not None:
+        cache.hits += hits
+        cache.misses += misses
+    return results
@@ -0,0 +1,129 @@
+"""
+One-pass smali parser and per-app class index.
+
+parse_smali() reads a class file line by line and records each method's
+boundaries and the methods it invokes, so checks can look at specific methods
+(entry points, lifecycle callbacks) instead of regex-scanning whole files.
+SmaliIndex maps class names to files across smali/ and smali_classesN/ with a
+single directory walk and caches parsed classes for reuse by several checks.
+"""
+
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+METHOD_PATTERN = re.compile(r'^\.method\s+(?:[\w-]+\s+)*([^\s(]+)(\([^)]*\)\S+)')
+INVOKE_PATTERN = re.compile(r'^invoke-\S+\s+\{[^}]*\},\s*(\S+?)->([^(\s]+)(\([^)]*\)\S+)')
+# smali/, smali_classesN/ and merged split directories (smali_<split>, smali_<split>_classesN)
+SMALI_DIR_PATTERN = re.compile(r'^smali(?:_(.+?))??(?:_classes(\d+))?$')
+
+
+@dataclass
+class SmaliMethod:
+    """A method body: name, descriptor, line span and invoked method references"""
+    name: str
+    descriptor: str
+    start_line: int
+    end_line: int = 0
+    # (owner class, method name, descriptor) in call order
+    invokes: List[Tuple[str, str, str]] = field(default_factory=list)
+
+    @property
+    def invoked_names(self) -> Set[str]:
+        return {name for _, name, _ in self.invokes}
+
+
+@dataclass
+class SmaliClass:
+    """A parsed class with its methods grouped by name (overloads share a key)"""
+    name: str
+    path: str
+    super_name: Optional[str] = None
+    methods: Dict[str, List[SmaliMethod]] = field(default_factory=dict)
+
+    def methods_named(self, names):
+        """Yield the methods whose name is in names"""
+        for name in names:
+            yield from self.methods.get(name, ())
+
+
+def class_descriptor(class_name):
+    """Turn 'com.example.Main' into 'Lcom/example/Main;' (descriptors pass through)"""
+    if class_name.startswith('L') and class_name.endswith(';'):
+        return class_name
+    return 'L' + class_name.replace('.', '/') + ';'
+
+
+def parse_smali(path):
+    """Parse a smali file in one pass and return its SmaliClass"""
+    smali_class = SmaliClass(name='', path=path)
+    current = None
+
+    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line[0] == '#':
+                continue
+
+            if current is not None:
+                if line.startswith('invoke-'):
+                    match = INVOKE_PATTERN.match(line)
+                    if match:
+                        current.invokes.append(match.groups())
+                elif line == '.end method':
+                    current.end_line = line_number
+                    smali_class.methods.setdefault(current.name, []).append(current)
+                    current = None
+            elif line.startswith('.method'):
+                match = METHOD_PATTERN.match(line)
+                if match:
+                    current = SmaliMethod(name=match.group(1), descriptor=match.group(2), start_line=line_number)
+            elif line.startswith('.class'):
+                smali_class.name = line.split()[-1]
+            elif line.startswith('.super'):
+                smali_class.super_name = line.split()[-1]
+
+    return smali_class
+
+
+def smali_dir_order(name):
+    """Sort key putting smali/ first, then smali_classes2..N, then each split's directories in the same order"""
+    match = SMALI_DIR_PATTERN.match(name)
+    if not match:
+        return (2, name, 0)
+    split, number = match.groups()
+    return (1 if split else 0, split or '', int(number or 1))
+
+
+class SmaliIndex:
+    """Class name -> smali file map for a decompiled app, with parsed classes cached"""
+
+    def __init__(self, base_path):
+        self.base_path = base_path
+        self.files = {}
+        self._classes = {}
+
+        for root, dirs, files in os.walk(base_path):
+            relative_root = os.path.relpath(root, base_path).replace('\\', '/')
+            top = relative_root.split('/', 1)[0]
+            if not top.startswith('smali'):
+                if relative_root != '.':
+                    dirs[:] = []
+                else:
+                    dirs.sort(key=smali_dir_order)
+                continue
+            package = relative_root[len(top) + 1:]
+            for file in files:
+                if file.endswith('.smali'):
+                    class_path = f'{package}/{file[:-6]}' if package else file[:-6]
+                    # The first smali directory wins, as in the merged dex
+                    self.files.setdefault(f'L{class_path};', os.path.join(root, file))
+
+    def find_class(self, class_name) -> Optional[SmaliClass]:
+        """Return the parsed class for a dotted name or descriptor, or None if absent"""
+        descriptor = class_descriptor(class_name)
+        if descriptor not in self._classes:
+            path = self.files.get(descriptor)
+            self._classes[descriptor] = parse_smali(path) if path else None
+        return self._classes[descriptor]
@@ -0,0 +1,70 @@
+"""
+Tests for the resources.arsc reader against tests/fixtures/resources.arsc.
+
+The fixture holds one package with two types (string, array) and four type
+chunks: default strings with 32-bit offsets (plus an integer entry), French
+API 21+ strings with 16-bit offsets and missing entries, de-rDE-xhdpi strings
+as a sparse table of compact entries, and a string-array mixing string and
+integer items.
+"""
+
+import os
+import struct
+import zipfile
+
+import pytest
+
+import arsc
+
+FIXTURE = os.path.join(os.path.dirname(__file__), 'fixtures', 'resources.arsc')
+
+
+@pytest.fixture
+def table():
+    with open(FIXTURE, 'rb') as f:
+        return f.read()
+
+
+def make_apk(path, data):
+    with zipfile.ZipFile(path, 'w') as apk:
+        apk.writestr('resources.arsc', data)
+    return str(path)
+
+
+def test_iter_resource_strings(table):
+    assert list(arsc.iter_resource_strings(table)) == [
+        ('@string/app_name', 'default', 'Example'),
+        ('@string/google_api_key', 'default', 'ABCDEFGHIJKLMNOPQRSTUVWXYZ012345'),
+        ('@string/base_url', 'default', 'https://api.example.com/v1/users'),
+        ('@string/app_name', 'fr-v21', 'Exemple'),
+        ('@string/app_name', 'de-rDE-xhdpi', 'Beispiel'),
+        ('@array/items', 'default', 'first'),
+        ('@array/items', 'default', 'second'),
+    ]
+
+
+def test_format_config_packed_language():
+    config = bytearray(64)
+    struct.pack_into('<I', config, 0, 64)
+    # Three-letter codes packed into 15 bits: language "fil", region 419 (Latin America)
+    config[8:10] = b'\xad\x05'
+    config[10:12] = b'\xa4\x24'
+    assert arsc.format_config(bytes(config), 0) == 'fil-r419'
+
+
+def test_collect_resource_strings_merges_configs(tmp_path, table):
+    resources = arsc.collect_resource_strings(make_apk(tmp_path / 'app.apk', table))
+    assert resources['Example'] == {'@string/app_name': ['default']}
+    assert resources['second'] == {'@array/items': ['default']}
+
+
+def test_main_matches_name_keyed_rules(tmp_path, table, capsys):
+    assert arsc.main([make_apk(tmp_path / 'app.apk', table)], None)
+    output = capsys.readouterr().out
+    assert 'Generic API Key in resources.arsc @string/google_api_key [default]' in output
+    assert 'https://api.example.com/v1/users' in output
+
+
+def test_main_reports_unreadable_table(tmp_path, table, capsys):
+    assert not arsc.main([make_apk(tmp_path / 'app.apk', table[:200])], None)
+    assert 'Cannot read resources.arsc' in capsys.readouterr().out
@@ -0,0 +1,84 @@
+"""
+Tests for the binary XML decoder against tests/fixtures/AndroidManifest.xml.
+
+The fixture is a small manifest with a UTF-16 string pool: a package and
+integer versionCode, a permission with a hex protectionLevel, and an
+application with boolean flags and one exported activity.
+"""
+
+import os
+import struct
+
+import pytest
+
+import axml
+
+FIXTURE = os.path.join(os.path.dirname(__file__), 'fixtures', 'AndroidManifest.xml')
+# The string pool follows the 8-byte document header
+POOL_OFFSET = 8
+
+
+@pytest.fixture
+def manifest():
+    with open(FIXTURE, 'rb') as f:
+        return f.read()
+
+
+def test_decode_xml(manifest):
+    assert axml.decode_xml(manifest).splitlines() == [
+        '<?xml version="1.0" encoding="utf-8" standalone="no"?>',
+        '<manifest xmlns:android="http://schemas.android.com/apk/res/android" '
+        'android:versionCode="7" package="com.example.app">',
+        '    <permission android:name="com.example.app.READ" android:protectionLevel="signature">',
+        '    </permission>',
+        '    <application android:allowBackup="false" android:debuggable="true">',
+        '        <activity android:exported="true" android:name=".MainActivity">',
+        '        </activity>',
+        '    </application>',
+        '</manifest>',
+    ]
+
+
+def test_parse_string_pool(manifest):
+    strings = axml.parse_string_pool(manifest, POOL_OFFSET)
+    assert 'com.example.app' in strings
+    assert axml.ANDROID_NS in strings
+
+
+@pytest.mark.parametrize('data', [b'', b'\x03\x00', b'PK\x03\x04' + b'\0' * 60])
+def test_decode_xml_rejects_non_axml(data):
+    with pytest.raises(ValueError):
+        axml.decode_xml(data)
+
+
+def test_decode_xml_rejects_truncated_pool(manifest):
+    with pytest.raises(ValueError):
+        axml.decode_xml(manifest[:POOL_OFFSET + 40])
+
+
+def test_decode_xml_truncated_anywhere_raises_value_error_only(manifest):
+    # Cuts on a chunk boundary decode to a partial document; anything else must be a ValueError
+    for length in range(len(manifest)):
+        try:
+            axml.decode_xml(manifest[:length])
+        except ValueError:
+            pass
+
+
+def test_string_offset_out_of_range(manifest):
+    data = bytearray(manifest)
+    # First entry of the pool's string offset table, right after its 28-byte header
+    struct.pack_into('<I', data, POOL_OFFSET + 28, len(data) * 2)
+    with pytest.raises(ValueError):
+        axml.parse_string_pool(bytes(data), POOL_OFFSET)
+    with pytest.raises(ValueError):
+        axml.decode_xml(bytes(data))
+
+
+def test_chunk_size_too_small(manifest):
+    data = bytearray(manifest)
+    pool_size, = struct.unpack_from('<I', data, POOL_OFFSET + 4)
+    # Header of the first chunk after the string pool
+    struct.pack_into('<I', data, POOL_OFFSET + pool_size + 4, 4)
+    with pytest.raises(ValueError):
+        axml.decode_xml(bytes(data))
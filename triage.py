@@ -0,0 +1,96 @@
+"""
+Quick triage tier: manifest-level checks and cheap zip heuristics.
+
+Everything here reads the APK zip directly (the manifest and res/xml files are
+decoded from binary XML in memory), so a risk score is available in well under
+a second per APK without starting apktool.
+"""
+
+import io
+import re
+import zipfile
+
+import axml
+from exported import find_exported_components
+from permissions import find_permissions
+from providerRoot import check_for_path_slash
+
+DEFAULT_ESCALATE_THRESHOLD = 10
+
+# Points added to the risk score per finding
+RISK_WEIGHTS = {
+    'exported activity': 1,
+    'exported service': 2,
+    'exported receiver': 2,
+    'exported provider': 3,
+    'weak permission': 2,
+    'provider root path': 5,
+    'debuggable': 5,
+    'cleartext traffic': 2,
+    'backup allowed': 1,
+    'embedded code': 3,
+    'native libraries': 1,
+}
+
+NESTED_CODE_PATTERN = re.compile(r'^(?:assets|res/raw)/.+\.(?:apk|dex|jar|zip)$', re.IGNORECASE)
+DEX_PATTERN = re.compile(r'^classes\d*\.dex$')
+
+
+def _application_flag(manifest_content, attribute):
+    match = re.search(r'<application\b[^>]*\bandroid:' + attribute + r'="([^"]*)"', manifest_content)
+    return match.group(1) if match else None
+
+
+def quick_scan(apk_path):
+    """Run the manifest-level checks and zip heuristics on an APK without decompiling it.
+
+    Returns a dict with the raw findings, a list of (reason, points) and the total score.
+    """
+    with zipfile.ZipFile(apk_path) as apk:
+        manifest_content = axml.decode_xml(apk.read('AndroidManifest.xml'))
+
+        provider_paths = []
+        for entry in apk.namelist():
+            if entry.startswith('res/xml') and entry.endswith('.xml'):
+                try:
+                    xml_content = axml.decode_xml(apk.read(entry))
+                except ValueError:
+                    continue
+                for tag, _ in check_for_path_slash(io.StringIO(xml_content)):
+                    provider_paths.append((entry, tag))
+
+        names = apk.namelist()
+        dex_files = [name for name in names if DEX_PATTERN.match(name)]
+        native_libraries = [name for name in names if name.startswith('lib/') and name.endswith('.so')]
+        nested_code = [name for name in names if NESTED_CODE_PATTERN.match(name)]
+
+    exported = find_exported_components(manifest_content)
+    weak_permissions = find_permissions(manifest_content)
+    debuggable = _application_flag(manifest_content, 'debuggable') == 'true'
+    cleartext = _application_flag(manifest_content, 'usesCleartextTraffic') == 'true'
+    backup = _application_flag(manifest_content, 'allowBackup') != 'false'
+
+    counts = {f'exported {component}': len(component_names) for component, component_names in exported.items()}
+    counts.update({
+        'weak permission': len(weak_permissions),
+        'provider root path': len(provider_paths),
+        'debuggable': int(debuggable),
+        'cleartext traffic': int(cleartext),
+        'backup allowed': int(backup),
+        'embedded code': int(bool(nested_code)),
+        'native libraries': int(bool(native_libraries)),
+    })
+    reasons = [(reason if count == 1 else f'{reason} x{count}', RISK_WEIGHTS[reason] * count)
+               for reason, count in counts.items() if count]
+
+    return {
+        'manifest': manifest_content,
+        'exported': exported,
+        'permissions': weak_permissions,
+        'provider_paths': provider_paths,
+        'dex_count': len(dex_files),
+        'native_libraries': native_libraries,
+        'nested_code': nested_code,
+        'reasons': reasons,
+        'score': sum(points for _, points in reasons),
+    }